@@ -0,0 +1,115 @@
+"""
+Compares per-request overhead of the bearer auth middleware on an SSE endpoint.
+
+    uv run python -m benchmarks.bench_auth [--requests 2000] [--frames 100]
+
+The agent is replaced by a stub that streams `frames` SSE frames, so the
+difference between rows is middleware cost: the previous
+`BaseHTTPMiddleware` implementation, the pure ASGI one, and no auth at all.
+"""
+
+import argparse
+import asyncio
+import os
+from time import perf_counter
+
+import httpx
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from . import fakes  # noqa: F401  (sets the settings the app needs)
+
+
+class _LegacyBearerAuthMiddleware(BaseHTTPMiddleware):
+    """The `BaseHTTPMiddleware` implementation this benchmark compares against."""
+
+    def __init__(self, app, excluded_paths: tuple[str] | None = None) -> None:
+        super().__init__(app)
+        self._excluded_paths = excluded_paths or ("/docs", "/redoc", "/openapi.json")
+
+    async def dispatch(self, request: Request, call_next):
+        from src.core.config import app_config
+
+        if request.url.path in self._excluded_paths:
+            return await call_next(request)
+
+        auth_header = request.headers.get("Authorization")
+        if not auth_header:
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"detail": "Authorization header missing"},
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        scheme, token = auth_header.split()
+        if token != app_config.SERVER.TOKEN.get_secret_value():
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"detail": "Incorrect Bearer Token"},
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        return await call_next(request)
+
+
+def _app(middleware: type | None, frames: int) -> FastAPI:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware, excluded_paths=["/ping"])
+
+    async def stream():
+        for i in range(frames):
+            yield f'data: {{"type": "token", "delta": "word{i} "}}\n\n'
+        yield "data: [DONE]\n\n"
+
+    @app.post("/api/v1/agent/stream")
+    async def stream_agent():
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+async def _measure(app: FastAPI, requests: int) -> float:
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        headers={"Authorization": f"Bearer {os.environ['SERVER_TOKEN']}"},
+    ) as client:
+        for _ in range(50):
+            await client.post("/api/v1/agent/stream")
+
+        started_at = perf_counter()
+        for _ in range(requests):
+            response = await client.post("/api/v1/agent/stream")
+            assert response.status_code == 200
+
+        return (perf_counter() - started_at) / requests
+
+
+async def main(requests: int, frames: int) -> dict[str, float]:
+    from src.api.middleware.bearer_auth_middleware import BearerAuthMiddleware
+
+    results = {}
+    for name, middleware in (
+        ("BaseHTTPMiddleware", _LegacyBearerAuthMiddleware),
+        ("pure ASGI", BearerAuthMiddleware),
+        ("no auth", None),
+    ):
+        results[name] = await _measure(_app(middleware, frames), requests)
+        print(f"{name:<20} {results[name] * 1e6:8.1f} us/request")
+
+    overhead = results["BaseHTTPMiddleware"] - results["no auth"]
+    print(
+        f"auth overhead: {overhead * 1e6:.1f} us -> "
+        f"{(results['pure ASGI'] - results['no auth']) * 1e6:.1f} us per request"
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.frames))
@@ -0,0 +1,64 @@
+"""
+Compares CPU time of decoding ScraperAPI payloads on the strict and fast paths,
+and of building the chatbot view of a decoded product.
+
+    uv run python -m benchmarks.bench_decode
+"""
+
+import json
+import timeit
+
+from src.core.models.amazon_product_details import AmazonProductDetails
+from src.core.models.amazon_search_result import AmazonSearchResult
+
+from .payloads import encode, product_payload, search_payload
+
+
+def _legacy_search(raw: bytes) -> AmazonSearchResult:
+    data = json.loads(raw)
+    data["results"] = [item for item in data["results"] if "asin" in item]
+    return AmazonSearchResult(**data)
+
+
+def _legacy_details(raw: bytes) -> AmazonProductDetails:
+    data = json.loads(raw)
+    data["url"] = "https://www.amazon.com/dp/B000000000"
+    return AmazonProductDetails(**data)
+
+
+def _report(name: str, fn, arg, number: int) -> float:
+    best = min(timeit.repeat(lambda: fn(arg), number=number, repeat=5)) / number
+    print(f"{name:<28} {best * 1e6:10.1f} us/op")
+    return best
+
+
+def main(number: int = 500) -> dict[str, float]:
+    search_raw = encode(search_payload())
+    details_raw = encode(product_payload("B000000000"))
+    details = AmazonProductDetails.from_json(details_raw, url="https://www.amazon.com/dp/B000000000")
+
+    results = {
+        "search_strict": _report("search (strict)", _legacy_search, search_raw, number),
+        "search_fast": _report(
+            "search (fast)", lambda raw: AmazonSearchResult.from_json(raw), search_raw, number
+        ),
+        "details_strict": _report("details (strict)", _legacy_details, details_raw, number),
+        "details_fast": _report(
+            "details (fast)",
+            lambda raw: AmazonProductDetails.from_json(raw, url="https://www.amazon.com/dp/B000000000"),
+            details_raw,
+            number,
+        ),
+        "to_chatbot_view": _report(
+            "to_chatbot_view", lambda details: details.to_chatbot_view(), details, number
+        ),
+    }
+    print(
+        f"search speedup: {results['search_strict'] / results['search_fast']:.2f}x, "
+        f"details speedup: {results['details_strict'] / results['details_fast']:.2f}x"
+    )
+    return results
+
+
+if __name__ == "__main__":
+    main()
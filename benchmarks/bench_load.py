@@ -0,0 +1,198 @@
+"""
+Load scenarios against the real app with a fake chat model and a fake ScraperAPI.
+
+    uv run python -m benchmarks.bench_load [--scenario stream] [--users 20] [--turns 5]
+
+The app is served by uvicorn on a local port in this process and driven over
+HTTP, so routing, middleware, SSE framing and the agent graph are all on
+the measured path. No OpenAI or ScraperAPI credits are used. Each scenario
+reports latency percentiles, requests per second, time to first token (for
+streams, first product line for products) and RSS growth.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+from dataclasses import dataclass, replace
+from time import perf_counter
+from typing import Literal
+
+import httpx
+
+from .fakes import FakeChatModel, install_fake_agent, install_fake_scraperapi, scraperapi_transport
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    endpoint: Literal["run", "stream", "products"]
+    users: int = 10
+    turns: int = 5
+    tokens: int = 200
+    token_delay: float = 0.0
+    upstream_latency: tuple[float, float] = (0.01, 0.05)
+    rate_limit_ratio: float = 0.0
+
+
+SCENARIOS = {
+    "run": Scenario(endpoint="run"),
+    "stream": Scenario(endpoint="stream", token_delay=0.001),
+    "stream-rate-limited": Scenario(endpoint="stream", token_delay=0.001, rate_limit_ratio=0.05),
+    "products": Scenario(endpoint="products", users=20),
+}
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Peak rather than current RSS where /proc is not available.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+
+
+class StreamError(Exception):
+    """A stream that answered 200 but reported a failure in an `error` event."""
+
+
+async def _turn(client: httpx.AsyncClient, scenario: Scenario, thread_id: str, prompt: str) -> float | None:
+    """Sends one turn and returns its time to first token (or first product line)."""
+    if scenario.endpoint == "products":
+        started_at = perf_counter()
+        first_product = None
+        async with client.stream(
+            "POST",
+            "/api/v1/products/search",
+            json={"query": prompt, "top_n_products": 5},
+            headers={"Accept": "application/x-ndjson"},
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if first_product is None and line.startswith('{"type": "product"'):
+                    first_product = perf_counter() - started_at
+
+        return first_product
+
+    body = {"messages": [{"role": "user", "content": prompt}], "thread_id": thread_id}
+    if scenario.endpoint == "run":
+        response = await client.post("/api/v1/agent/run", json=body)
+        response.raise_for_status()
+        return None
+
+    started_at = perf_counter()
+    first_token = None
+    async with client.stream("POST", "/api/v1/agent/stream", json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line.startswith('data: {"type": "token"'):
+                first_token = perf_counter() - started_at
+            elif line.startswith('data: {"type": "error"'):
+                raise StreamError(json.loads(line.removeprefix("data: "))["error"])
+
+    return first_token
+
+
+async def run_scenario(name: str, scenario: Scenario) -> dict[str, float]:
+    import uvicorn
+
+    from src.server import app
+
+    install_fake_agent(FakeChatModel(tokens=scenario.tokens, token_delay=scenario.token_delay))
+    install_fake_scraperapi(
+        scraperapi_transport(latency=scenario.upstream_latency, rate_limit_ratio=scenario.rate_limit_ratio)
+    )
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="on"))
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    errors = 0
+
+    async def user(client: httpx.AsyncClient, index: int) -> None:
+        nonlocal errors
+        for turn in range(scenario.turns):
+            # One word per turn keeps every search distinct, so upstream is really exercised.
+            prompt = f"{name.replace('-', '')}{index}x{turn}"
+            started_at = perf_counter()
+            try:
+                ttft = await _turn(client, scenario, f"load-{name}-{index}", prompt)
+            except (httpx.HTTPError, StreamError):
+                errors += 1
+                continue
+
+            latencies.append(perf_counter() - started_at)
+            if ttft is not None:
+                ttfts.append(ttft)
+
+    rss_before = _rss_mb()
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{sock.getsockname()[1]}",
+        headers={"Authorization": f"Bearer {os.environ['SERVER_TOKEN']}"},
+        timeout=120,
+        limits=httpx.Limits(max_connections=scenario.users),
+    ) as client:
+        started_at = perf_counter()
+        await asyncio.gather(*[user(client, index) for index in range(scenario.users)])
+        wall = perf_counter() - started_at
+
+    server.should_exit = True
+    await serving
+
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / wall,
+        **{f"{key}_ms": value for key, value in _percentiles(latencies).items()},
+        "rss_growth_mb": _rss_mb() - rss_before,
+    }
+    if ttfts:
+        result.update({f"ttft_{key}_ms": value for key, value in _percentiles(ttfts).items()})
+
+    print(
+        f"{name:<22} {result['rps']:7.1f} req/s  p50 {result['p50_ms']:7.1f}  "
+        f"p95 {result['p95_ms']:7.1f}  p99 {result['p99_ms']:7.1f} ms  "
+        + (f"ttft p50 {result['ttft_p50_ms']:6.1f} ms  " if ttfts else "")
+        + f"rss +{result['rss_growth_mb']:.1f} MB  errors {errors}"
+    )
+    return result
+
+
+async def main(names: list[str], users: int | None = None, turns: int | None = None) -> dict[str, dict[str, float]]:
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        scenario = replace(scenario, users=users or scenario.users, turns=turns or scenario.turns)
+        results[name] = await run_scenario(name, scenario)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--turns", type=int)
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args.scenario or list(SCENARIOS), users=args.users, turns=args.turns))
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
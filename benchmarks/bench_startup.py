@@ -0,0 +1,97 @@
+"""
+Measures cold start of a fresh worker and profiles what its imports cost.
+
+    uv run python -m benchmarks.bench_startup [--runs 5] [--top 15]
+
+Every run is a new interpreter. It reports the time to import `src.server`,
+the time until the lifespan is ready to serve (with AGENT_BUILD=startup and
+AGENT_BUILD=lazy), and the top-level packages that dominate import time
+according to `python -X importtime`.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from . import fakes  # noqa: F401  (sets the settings the app needs)
+
+_PROBE = """
+import asyncio, json
+from time import perf_counter
+
+started_at = perf_counter()
+from src.server import app
+imported_at = perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready_at = perf_counter()
+    return ready_at
+
+ready_at = asyncio.run(main())
+print(json.dumps({"import_ms": (imported_at - started_at) * 1000, "ready_ms": (ready_at - started_at) * 1000}))
+"""
+
+
+def _run(code: str, *args: str, env: dict[str, str] | None = None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "LOGURU_LEVEL": "WARNING", **(env or {})},
+    )
+
+
+def measure(runs: int) -> dict[str, float]:
+    results: dict[str, float] = {}
+    for build in ("startup", "lazy"):
+        samples = [
+            json.loads(_run(_PROBE, env={"AGENT_BUILD": build}).stdout.strip().splitlines()[-1])
+            for _ in range(runs)
+        ]
+        results[f"{build}_import_ms"] = statistics.median(s["import_ms"] for s in samples)
+        results[f"{build}_ready_ms"] = statistics.median(s["ready_ms"] for s in samples)
+
+    return results
+
+
+def import_profile(top: int) -> list[tuple[str, float]]:
+    """Self import time in ms per top-level package, largest first."""
+    stderr = _run("import src.server", "-X", "importtime").stderr
+    per_package: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, _, module = line.removeprefix("import time:").split("|")
+        per_package[module.strip().split(".")[0]] += int(self_us) / 1000
+
+    return sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(runs: int = 5, top: int = 15) -> dict[str, float]:
+    results = measure(runs)
+    for build in ("startup", "lazy"):
+        print(
+            f"AGENT_BUILD={build:<8} import {results[f'{build}_import_ms']:7.1f} ms  "
+            f"ready {results[f'{build}_ready_ms']:7.1f} ms"
+        )
+
+    print("\nimport time by top-level package (self time):")
+    for package, ms in import_profile(top):
+        print(f"  {package:<28} {ms:7.1f} ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    main(args.runs, args.top)
@@ -0,0 +1,81 @@
+"""
+Compares the SSE pipelines of AgentService.stream_agent with a fake chat model.
+
+    uv run python -m benchmarks.bench_stream [--streams 50] [--tokens 500]
+
+Reports SSE frames and model tokens per second of wall time, and CPU time
+per stream, for the legacy `astream_events` path and the `messages` path
+with and without token coalescing.
+"""
+
+import argparse
+import asyncio
+from time import perf_counter, process_time
+
+from .fakes import FakeChatModel, install_fake_agent
+
+
+async def _consume(request) -> int:
+    from src.api.services.agent_service import AgentService
+
+    frames = 0
+    lease = await AgentService.acquire_thread(request)
+    async for _ in AgentService.stream_agent(request=request, lease=lease):
+        frames += 1
+    return frames
+
+
+async def _run(pipeline: str, flush_chars: int, *, streams: int, concurrency: int) -> dict[str, float]:
+    from src.api.core.models import ChatRequest
+    from src.core.config import app_config
+
+    app_config.AGENT.STREAM_PIPELINE = pipeline
+    app_config.AGENT.STREAM_FLUSH_CHARS = flush_chars
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> int:
+        async with semaphore:
+            return await _consume(
+                ChatRequest(
+                    messages=[{"role": "user", "content": "recommend a gaming mouse"}],
+                    thread_id=f"bench-{pipeline}-{flush_chars}-{i}",
+                    stream_mode=["messages", "custom"],
+                )
+            )
+
+    wall, cpu = perf_counter(), process_time()
+    frames = sum(await asyncio.gather(*[one(i) for i in range(streams)]))
+    wall, cpu = perf_counter() - wall, process_time() - cpu
+
+    return {"wall": wall, "cpu_per_stream_ms": cpu / streams * 1000, "frames": frames}
+
+
+async def main(streams: int, tokens: int, concurrency: int) -> dict[str, dict[str, float]]:
+    install_fake_agent(FakeChatModel(tokens=tokens, use_tools=False))
+
+    results = {}
+    for name, pipeline, flush_chars in (
+        ("events (legacy)", "events", 0),
+        ("messages", "messages", 0),
+        ("messages + coalescing", "messages", 48),
+    ):
+        await _run(pipeline, flush_chars, streams=2, concurrency=concurrency)
+        result = await _run(pipeline, flush_chars, streams=streams, concurrency=concurrency)
+        results[name] = result
+        print(
+            f"{name:<24} {streams * tokens / result['wall']:10.0f} tokens/s "
+            f"{result['frames'] / result['wall']:10.0f} frames/s "
+            f"{result['cpu_per_stream_ms']:8.2f} ms CPU/stream"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.streams, args.tokens, args.concurrency))
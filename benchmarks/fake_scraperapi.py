@@ -0,0 +1,96 @@
+"""
+Local stand-in for the ScraperAPI structured Amazon endpoints.
+
+    uv run python -m benchmarks.fake_scraperapi --port 8081 --latency 0.2 0.8 --rate-limit 0.05
+    SCRAPERAPI_BASE_URL=http://localhost:8081 make run
+
+The same app is mounted in-process by the load benchmarks through
+`httpx.ASGITransport`, so no socket or real credits are needed.
+"""
+
+import argparse
+import asyncio
+import random
+
+from fastapi import FastAPI, Query, Response, status
+
+from .payloads import encode, product_payload, search_payload
+
+
+def create_app(
+    *,
+    latency: tuple[float, float] = (0.0, 0.0),
+    rate_limit_ratio: float = 0.0,
+    results: int = 48,
+    reviews: int = 10,
+    seed: int = 0,
+) -> FastAPI:
+    """
+    Builds the fake API.
+
+    `latency` is a (min, max) range in seconds sampled per request,
+    `rate_limit_ratio` the share of requests answered with a 429, and
+    `results`/`reviews` control the payload size of searches and details.
+    """
+    rng = random.Random(seed)
+    app = FastAPI(title="Fake ScraperAPI")
+    app.state.requests = {"search": 0, "product": 0, "rate_limited": 0}
+
+    async def simulate(kind: str) -> Response | None:
+        app.state.requests[kind] += 1
+        if latency[1]:
+            await asyncio.sleep(rng.uniform(*latency))
+
+        if rate_limit_ratio and rng.random() < rate_limit_ratio:
+            app.state.requests["rate_limited"] += 1
+            return Response(
+                "Too Many Requests",
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": "0"},
+            )
+
+        return None
+
+    @app.get("/search/v1")
+    async def search(query: str, page: int = Query(default=1)) -> Response:
+        if (rate_limited := await simulate("search")) is not None:
+            return rate_limited
+
+        payload = search_payload(query, results=results, seed=seed + page)
+        return Response(encode(payload), media_type="application/json")
+
+    @app.get("/product/v1")
+    async def product(asin: str) -> Response:
+        if (rate_limited := await simulate("product")) is not None:
+            return rate_limited
+
+        payload = product_payload(asin, reviews=reviews, seed=seed)
+        return Response(encode(payload), media_type="application/json")
+
+    @app.head("/")
+    async def root() -> Response:
+        return Response()
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.0, 0.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--results", type=int, default=48)
+    parser.add_argument("--reviews", type=int, default=10)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(
+            latency=tuple(args.latency),
+            rate_limit_ratio=args.rate_limit,
+            results=args.results,
+            reviews=args.reviews,
+        ),
+        port=args.port,
+    )
@@ -0,0 +1,112 @@
+"""Deterministic stand-ins for the chat model and ScraperAPI used by the benchmarks."""
+
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# The app reads its settings at import time; benchmarks never talk to the real services.
+os.environ.setdefault("SCRAPERAPI_KEY", "benchmark")
+os.environ.setdefault("SERVER_TOKEN", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Calls `search_on_amazon` once per turn, then streams a fixed answer.
+
+    `tokens` controls the answer length and `token_delay` the pause between
+    streamed tokens (0 makes the stream CPU-bound). Without a fixed `query`
+    the last user message is searched for.
+    """
+
+    tokens: int = 200
+    token_delay: float = 0.0
+    query: str | None = None
+    use_tools: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        return self
+
+    def _reply(self, messages: list[BaseMessage]) -> AIMessage:
+        turn_started = max(
+            (i for i, m in enumerate(messages) if m.type == "human"), default=0
+        )
+        searched = any(isinstance(m, ToolMessage) for m in messages[turn_started:])
+        if self.use_tools and not searched:
+            query = self.query or (messages[turn_started].text if messages else "gaming mouse")
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "search_on_amazon",
+                        "args": {"queries": [query], "top_n_products": 5},
+                        "id": f"call_{len(messages)}",
+                    }
+                ],
+            )
+
+        return AIMessage(content=" ".join(f"word{i}" for i in range(self.tokens)))
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        if reply.tool_calls:
+            call = reply.tool_calls[0]
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": call["name"],
+                            "args": json.dumps(call["args"]),
+                            "id": call["id"],
+                            "index": 0,
+                        }
+                    ],
+                )
+            )
+            return
+
+        for i in range(self.tokens):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=f"word{i} "))
+
+
+def scraperapi_transport(**options: Any) -> httpx.AsyncBaseTransport:
+    """Serves the fake ScraperAPI app in-process; `options` are passed to `create_app`."""
+    from .fake_scraperapi import create_app
+
+    return httpx.ASGITransport(app=create_app(**options))
+
+
+def install_fake_scraperapi(transport: httpx.AsyncBaseTransport) -> None:
+    from src.services import scraperapi_service
+
+    http_client = scraperapi_service.get_http_client()
+    http_client._client = httpx.AsyncClient(
+        base_url="http://fake-scraperapi",
+        transport=transport,
+        event_hooks={"request": [http_client.count_request]},
+    )
+
+
+def install_fake_agent(model: FakeChatModel) -> None:
+    from src.agent import build_agent, set_agent
+
+    set_agent(build_agent(model=model, summarization_model=model), model)
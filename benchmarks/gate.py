@@ -0,0 +1,99 @@
+"""
+Runs the offline benchmark suite and compares it with a saved baseline.
+
+    uv run python -m benchmarks.gate --against main [--tolerance 0.25]
+    uv run python -m benchmarks.gate --save benchmarks/baseline.json
+    uv run python -m benchmarks.gate --baseline benchmarks/baseline.json
+
+Exits with status 1 when a metric regresses by more than `tolerance`
+(relative) and its absolute slack, so it can gate CI. Baselines are
+machine-specific: `--against` measures one on this machine from a git
+checkout of the given revision, so no baseline file has to be kept in
+sync with the runner that checks it.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from . import bench_decode, bench_load, bench_startup
+
+# Absolute slack per unit, so tiny metrics don't fail on scheduler noise.
+_SLACK = {"_us": 2.0, "_ms": 10.0, "_mb": 16.0}
+
+
+def collect() -> dict[str, float]:
+    metrics = {f"decode.{name}_us": value * 1e6 for name, value in bench_decode.main().items()}
+    for scenario, result in asyncio.run(bench_load.main(list(bench_load.SCENARIOS))).items():
+        metrics.update({f"load.{scenario}.{key}": value for key, value in result.items() if key != "requests"})
+    metrics.update({f"startup.{name}": value for name, value in bench_startup.measure(runs=5).items()})
+
+    return metrics
+
+
+def collect_at(revision: str) -> dict[str, float]:
+    """Runs the suite on a temporary git worktree of `revision`."""
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, "baseline")
+        output = os.path.join(tmp, "baseline.json")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, revision], check=True, capture_output=True)
+        try:
+            subprocess.run([sys.executable, "-m", "benchmarks.gate", "--save", output], cwd=worktree, check=True)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], check=True, capture_output=True)
+
+        with open(output) as results:
+            return json.load(results)
+
+
+def compare(current: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    regressions = []
+    for name, expected in baseline.items():
+        if (value := current.get(name)) is None:
+            continue
+
+        if name.endswith(".errors"):
+            regressed = value > expected
+        elif name.endswith(".rps"):
+            regressed = value < expected * (1 - tolerance)
+        else:
+            slack = next((slack for suffix, slack in _SLACK.items() if name.endswith(suffix)), 0.0)
+            regressed = value > expected * (1 + tolerance) and value - expected > slack
+
+        if regressed:
+            regressions.append(f"{name}: {value:.2f} (baseline {expected:.2f})")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", help="Fail if the results regress against this file")
+    parser.add_argument("--against", metavar="REVISION", help="Fail if the results regress against this git revision")
+    parser.add_argument("--save", help="Write the results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.against:
+        baseline = collect_at(args.against)
+    elif args.baseline:
+        with open(args.baseline) as results:
+            baseline = json.load(results)
+
+    metrics = collect()
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(metrics, output, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(metrics, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        print(f"{len(regressions)} regressions against {args.against or args.baseline}")
+        sys.exit(1 if regressions else 0)
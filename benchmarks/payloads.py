@@ -0,0 +1,108 @@
+"""Synthetic ScraperAPI payloads shaped like real /search/v1 and /product/v1 responses."""
+
+import json
+import random
+
+
+def search_payload(query: str = "gaming mouse", *, results: int = 48, seed: int = 0) -> dict:
+    rng = random.Random(f"{query}:{seed}")
+    items = []
+    for position in range(1, results + 1):
+        asin = f"B0{rng.randrange(10**8):08d}"
+        price = round(rng.uniform(9, 400), 2)
+        items.append(
+            {
+                "type": "search_product",
+                "position": position,
+                "asin": asin,
+                "name": f"{query.title()} Model {position} with extended product title text",
+                "image": f"https://m.media-amazon.com/images/I/{asin}._AC_UL320_.jpg",
+                "has_prime": rng.random() < 0.6,
+                "is_best_seller": rng.random() < 0.1,
+                "is_amazon_choice": rng.random() < 0.1,
+                "is_limited_deal": rng.random() < 0.05,
+                "stars": round(rng.uniform(3, 5), 1),
+                "total_reviews": rng.randrange(10, 50_000),
+                "url": f"https://www.amazon.com/dp/{asin}/ref=sr_1_{position}",
+                "availability_quantity": None,
+                "spec": {},
+                "price_string": f"${price}",
+                "price_symbol": "$",
+                "price": price,
+                "original_price": {
+                    "price_string": f"${price * 1.2:.2f}",
+                    "price_symbol": "$",
+                    "price": round(price * 1.2, 2),
+                }
+                if rng.random() < 0.3
+                else None,
+            }
+        )
+
+        # Sponsored and editorial blocks come back without an ASIN.
+        if position % 12 == 0:
+            items.append({"type": "banner", "name": "Sponsored", "position": position})
+
+    return {
+        "results": items,
+        "explore_more_items": [
+            {"text": f"{query} {suffix}", "url": f"https://www.amazon.com/s?k={suffix}"}
+            for suffix in ("wireless", "rgb", "ergonomic", "lightweight", "bundle") * 4
+        ],
+        "next_pages": [
+            f"https://www.amazon.com/s?k={query.replace(' ', '+')}&page={page}"
+            for page in range(2, 8)
+        ],
+    }
+
+
+def product_payload(asin: str, *, reviews: int = 10, seed: int = 0) -> dict:
+    rng = random.Random(f"{asin}:{seed}")
+    return {
+        "name": f"Product {asin} with a long marketplace title",
+        "product_information": {f"spec_{i}": f"value {i}" for i in range(30)},
+        "brand": "Brand",
+        "brand_url": "https://www.amazon.com/stores/brand",
+        "full_description": "Lorem ipsum dolor sit amet. " * 40,
+        "pricing": f"${rng.uniform(9, 400):.2f}",
+        "list_price": "",
+        "shipping_price": "FREE",
+        "availability_status": "In Stock",
+        "is_coupon_exists": False,
+        "images": [f"https://m.media-amazon.com/images/I/{asin}_{i}.jpg" for i in range(8)],
+        "product_category": "Electronics › Computers › Mice",
+        "average_rating": round(rng.uniform(3, 5), 1),
+        "feature_bullets": [f"Feature bullet {i} " * 5 for i in range(6)],
+        "total_reviews": rng.randrange(10, 50_000),
+        "customers_say": {
+            "summary": "Customers like the build quality and responsiveness. " * 3,
+            "select_to_learn_more": {
+                aspect: {
+                    "total": 100,
+                    "positive": rng.randrange(50, 100),
+                    "negative": rng.randrange(0, 50),
+                }
+                for aspect in ("Quality", "Value", "Comfort", "Battery life", "Noise")
+            },
+        },
+        "reviews": [
+            {
+                "stars": rng.randrange(1, 6),
+                "date": "Reviewed in the United States on January 1, 2026",
+                "verified_purchase": True,
+                "manufacturer_replied": False,
+                "username": f"user{i}",
+                "user_url": "https://www.amazon.com/gp/profile/x",
+                "title": f"Review title {i}",
+                "review": "Detailed review text. " * 20,
+                "review_url": "https://www.amazon.com/gp/customer-reviews/x",
+                "total_found_helpful": rng.randrange(0, 100),
+                "images": [],
+            }
+            for i in range(reviews)
+        ],
+    }
+
+
+def encode(payload: dict) -> bytes:
+    return json.dumps(payload).encode()
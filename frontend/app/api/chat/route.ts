@@ -3,7 +3,7 @@ import type { NextRequest } from "next/server"
 export async function POST(req: NextRequest) {
     try {
         const body = await req.json()
-        const { messages, region = "us", stream_mode = ["messages", "state"] } = body
+        const { messages, thread_id, last_message_id, region = "us", stream_mode = ["messages", "state"] } = body
 
         const API_URL = process.env.AGENT_API_URL!
         const API_KEY = process.env.AGENT_API_KEY!
@@ -16,11 +16,20 @@ export async function POST(req: NextRequest) {
             },
             body: JSON.stringify({
                 messages,
+                thread_id,
+                last_message_id,
                 region,
                 stream_mode,
             }),
         })
 
+        if (response.status === 409) {
+            return new Response(response.body, {
+                status: 409,
+                headers: { "Content-Type": "application/json" },
+            })
+        }
+
         if (!response.ok) {
             throw new Error(`API error: ${response.status}`)
         }
@@ -28,6 +28,10 @@ export const ChatbotInterface = () => {
       streamingTextRef.current += token;
       setStreamingText(streamingTextRef.current);
     },
+    onProduct: (product) => {
+      lastSearchRef.current = [...(lastSearchRef.current ?? []), product];
+      setLastSearch(lastSearchRef.current);
+    },
     onFinalState: (state) => {
       if (state.last_search && Array.isArray(state.last_search)) {
         lastSearchRef.current = state.last_search;
@@ -140,6 +144,11 @@ export const ChatbotInterface = () => {
                   <Message from="assistant">
                     <MessageContent>
                       <Shimmer>The agent is thinking...</Shimmer>
+                      {lastSearch && lastSearch.length > 0 && (
+                        <div className="mt-4">
+                          <ProductGrid products={lastSearch} />
+                        </div>
+                      )}
                     </MessageContent>
                   </Message>
                 )}
@@ -149,6 +158,11 @@ export const ChatbotInterface = () => {
                       <MessageResponse>
                         {streamingText}
                       </MessageResponse>
+                      {lastSearch && lastSearch.length > 0 && (
+                        <div className="mt-4">
+                          <ProductGrid products={lastSearch} />
+                        </div>
+                      )}
                     </MessageContent>
                   </Message>
                 )}
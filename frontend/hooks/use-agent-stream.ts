@@ -3,14 +3,17 @@
 import { useCallback, useRef } from "react";
 
 interface StreamEvent {
-  type: "token" | "final_state" | "error" | "done";
+  type: "token" | "product" | "final_state" | "error" | "done";
   delta?: string;
+  rank?: number | null;
+  product?: any;
   state?: any;
   error?: string;
 }
 
 interface UseAgentStreamOptions {
   onToken?: (token: string) => void;
+  onProduct?: (product: any, rank: number | null) => void;
   onFinalState?: (state: any) => void;
   onError?: (error: string) => void;
   onComplete?: () => void;
@@ -20,6 +23,10 @@ export const useAgentStream = (options: UseAgentStreamOptions) => {
   const streamResponse = useRef<string>("");
   const abortControllerRef = useRef<AbortController | null>(null);
   const optionsRef = useRef(options);
+  const threadIdRef = useRef<string>(crypto.randomUUID());
+  // Id of the thread's latest message, from the last final_state; while set,
+  // only the new message is sent instead of the whole history.
+  const lastMessageIdRef = useRef<string | null>(null);
 
   optionsRef.current = options;
 
@@ -35,18 +42,30 @@ export const useAgentStream = (options: UseAgentStreamOptions) => {
       try {
         streamResponse.current = "";
 
-        const response = await fetch("/api/chat", {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            messages,
-            region: region || "us",
-            stream_mode: ["messages", "state"],
-          }),
-          signal: controller.signal,
-        });
+        const send = (delta: boolean) =>
+          fetch("/api/chat", {
+            method: "POST",
+            headers: {
+              "Content-Type": "application/json",
+            },
+            body: JSON.stringify({
+              messages: delta ? messages.slice(-1) : messages,
+              last_message_id: delta ? lastMessageIdRef.current : undefined,
+              thread_id: threadIdRef.current,
+              region: region || "us",
+              stream_mode: ["messages", "state"],
+            }),
+            signal: controller.signal,
+          });
+
+        const delta = lastMessageIdRef.current !== null;
+        lastMessageIdRef.current = null;
+
+        let response = await send(delta);
+        if (response.status === 409 && delta) {
+          // The thread moved on without us: resend the full history and let the server align it.
+          response = await send(false);
+        }
 
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
@@ -87,7 +106,10 @@ export const useAgentStream = (options: UseAgentStreamOptions) => {
                 if (parsed.type === "token" && parsed.delta) {
                   streamResponse.current += parsed.delta;
                   optionsRef.current.onToken?.(parsed.delta);
+                } else if (parsed.type === "product" && parsed.product) {
+                  optionsRef.current.onProduct?.(parsed.product, parsed.rank ?? null);
                 } else if (parsed.type === "final_state" && parsed.state) {
+                  lastMessageIdRef.current = parsed.state.message_id ?? null;
                   optionsRef.current.onFinalState?.(parsed.state);
                 } else if (parsed.type === "error") {
                   optionsRef.current.onError?.(parsed.error || "Unknown error");
@@ -108,6 +130,7 @@ export const useAgentStream = (options: UseAgentStreamOptions) => {
                 streamResponse.current += parsed.delta;
                 optionsRef.current.onToken?.(parsed.delta);
               } else if (parsed.type === "final_state" && parsed.state) {
+                lastMessageIdRef.current = parsed.state.message_id ?? null;
                 optionsRef.current.onFinalState?.(parsed.state);
               }
             } catch (e) { }
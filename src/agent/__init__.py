@@ -1,25 +1,102 @@
-from dotenv import load_dotenv
-from langchain.agents import create_agent
-from langchain.agents.middleware import SummarizationMiddleware, ToolCallLimitMiddleware
-from langchain.chat_models import init_chat_model
-from langgraph.checkpoint.memory import InMemorySaver
-
-from .prompts import SYSTEM_PROMPT
-from .state import State
-from .tools.search_on_amazon import search_on_amazon
-
-load_dotenv()
-
-agent = create_agent(
-    model=init_chat_model("gpt-5.2"),
-    system_prompt=SYSTEM_PROMPT,
-    tools=[search_on_amazon],
-    state_schema=State,
-    checkpointer=InMemorySaver(),
-    middleware=[
-        ToolCallLimitMiddleware(tool_name="search_on_amazon", run_limit=2),
-        SummarizationMiddleware(
-            model="gpt-5-mini", trigger=("tokens", 2048)
-        ),
-    ],
+import asyncio
+import threading
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from ..core.config import app_config
+from ..core.thread_scheduler import ThreadScheduler
+from .checkpointer import BoundedMemorySaver
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from langgraph.graph.state import CompiledStateGraph
+
+thread_scheduler = ThreadScheduler(
+    policy=app_config.AGENT.THREAD_POLICY, max_queue=app_config.AGENT.THREAD_QUEUE_SIZE
+)
+
+checkpointer = BoundedMemorySaver(
+    max_threads=app_config.CHECKPOINTER.MAX_THREADS,
+    max_bytes=app_config.CHECKPOINTER.MAX_BYTES,
+    idle_ttl=app_config.CHECKPOINTER.IDLE_TTL,
+    keep_last=app_config.CHECKPOINTER.KEEP_LAST,
+    sqlite_path=app_config.CHECKPOINTER.SQLITE_PATH,
+    sqlite_ttl=app_config.CHECKPOINTER.SQLITE_TTL,
+    in_flight=thread_scheduler.is_busy,
 )
+
+def build_agent(
+    model: "BaseChatModel", summarization_model: "BaseChatModel | str" = "gpt-5-mini"
+) -> "CompiledStateGraph":
+    # LangChain's agent factory and the tool modules are the bulk of import time,
+    # so they are only imported when an agent is actually built.
+    from langchain.agents import create_agent
+    from langchain.agents.middleware import ToolCallLimitMiddleware
+
+    from .middleware import TimedSummarizationMiddleware, TimingMiddleware
+    from .prompts import SYSTEM_PROMPT
+    from .state import State
+    from .tools.search_on_amazon import search_on_amazon
+
+    return create_agent(
+        model=model,
+        system_prompt=SYSTEM_PROMPT,
+        tools=[search_on_amazon],
+        state_schema=State,
+        checkpointer=checkpointer,
+        middleware=[
+            ToolCallLimitMiddleware(tool_name="search_on_amazon", run_limit=2),
+            TimedSummarizationMiddleware(
+                model=summarization_model, trigger=("tokens", 2048)
+            ),
+            TimingMiddleware(),
+        ],
+    )
+
+
+_agent: "CompiledStateGraph | None" = None
+_model: "BaseChatModel | None" = None
+_agent_lock = threading.Lock()
+
+
+def get_agent() -> "CompiledStateGraph":
+    """Builds the agent on first use; later calls return the same instance."""
+    global _agent, _model
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                from langchain.chat_models import init_chat_model
+
+                _model = init_chat_model(app_config.AGENT.MODEL)
+                _agent = build_agent(model=_model)
+                logger.info(f"Built agent with model {app_config.AGENT.MODEL}")
+
+    return _agent
+
+
+async def aget_agent() -> "CompiledStateGraph":
+    """Like `get_agent`, but a first build runs in a thread instead of blocking the event loop."""
+    if _agent is not None:
+        return _agent
+
+    return await asyncio.to_thread(get_agent)
+
+
+async def warm_up_agent() -> None:
+    """Builds the agent and opens the model provider connection ahead of the first request."""
+    await aget_agent()
+    client = getattr(_model, "root_async_client", None)
+    if client is None:
+        return
+
+    try:
+        await client.models.list()
+        logger.info(f"Warmed up model client for {app_config.AGENT.MODEL}")
+    except Exception as e:
+        logger.warning(f"Failed to warm up model client for {app_config.AGENT.MODEL}: {e}")
+
+
+def set_agent(agent: "CompiledStateGraph", model: "BaseChatModel | None" = None) -> None:
+    global _agent, _model
+    _agent, _model = agent, model
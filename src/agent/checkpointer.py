@@ -0,0 +1,398 @@
+import asyncio
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from time import monotonic, time
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from loguru import logger
+
+
+class _SQLiteThreadStore:
+    """Stores each thread's compacted checkpoints as one row, keyed by thread id."""
+
+    __slots__ = ("_conn", "_lock")
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS threads ("
+                "thread_id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def load(self, thread_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM threads WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+
+        return pickle.loads(row[0]) if row else None
+
+    def save(self, thread_id: str, snapshot: dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?, ?)",
+                (thread_id, pickle.dumps(snapshot), time()),
+            )
+
+    def delete(self, thread_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+
+    def purge(self, older_than: float) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM threads WHERE updated_at < ?", (older_than,)
+            ).rowcount
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            threads, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM threads"
+            ).fetchone()
+
+        return {"threads": threads, "bytes": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    InMemorySaver that bounds how much conversation state a worker keeps.
+
+    Only the latest `keep_last` checkpoints of each thread are retained, and
+    whole threads are evicted least-recently-used first once `max_threads` or
+    `max_bytes` is exceeded, or after `idle_ttl` seconds without activity.
+    Threads for which `in_flight` is true are never evicted, so a run does
+    not lose the checkpoints it is writing to.
+
+    With `sqlite_path` set, every write is also persisted to SQLite, so an
+    evicted thread is transparently reloaded on its next access. The async
+    methods load it in a worker thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = 1000,
+        max_bytes: int = 256 * 1024 * 1024,
+        idle_ttl: float = 60 * 60,
+        keep_last: int = 2,
+        sqlite_path: str | None = None,
+        sqlite_ttl: float = 7 * 24 * 60 * 60,
+        in_flight: Callable[[str], bool] | None = None,
+    ) -> None:
+        super().__init__()
+        self._max_threads = max_threads
+        self._max_bytes = max_bytes
+        self._idle_ttl = idle_ttl
+        self._keep_last = max(keep_last, 1)
+        self._sqlite_ttl = sqlite_ttl
+        self._disk = _SQLiteThreadStore(sqlite_path) if sqlite_path else None
+        self._in_flight = in_flight or (lambda _: False)
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        self._thread_bytes: dict[str, int] = {}
+        self._write_keys: defaultdict[str, set[tuple]] = defaultdict(set)
+        self._blob_keys: defaultdict[str, set[tuple]] = defaultdict(set)
+        self._total_bytes = 0
+        self.evictions = 0
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_access[thread_id] = monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def _ensure_loaded(self, thread_id: str) -> None:
+        if thread_id in self._last_access or self._disk is None:
+            return
+
+        if (snapshot := self._disk.load(thread_id)) is not None:
+            self._restore(thread_id, snapshot)
+
+    async def _aensure_loaded(self, thread_id: str) -> None:
+        if thread_id in self._last_access or self._disk is None:
+            return
+
+        snapshot = await asyncio.to_thread(self._disk.load, thread_id)
+        # Another task may have loaded or written the thread while this one read it.
+        if snapshot is not None and thread_id not in self._last_access:
+            self._restore(thread_id, snapshot)
+
+    def _snapshot(self, thread_id: str) -> dict[str, Any]:
+        return {
+            "storage": {ns: dict(cps) for ns, cps in self.storage[thread_id].items()},
+            "writes": {k: dict(self.writes[k]) for k in self._write_keys[thread_id]},
+            "blobs": {k: self.blobs[k] for k in self._blob_keys[thread_id]},
+        }
+
+    def _restore(self, thread_id: str, snapshot: dict[str, Any]) -> None:
+        for ns, checkpoints in snapshot["storage"].items():
+            self.storage[thread_id][ns].update(checkpoints)
+
+        for key, writes in snapshot["writes"].items():
+            self.writes[key] = writes
+            self._write_keys[thread_id].add(key)
+
+        for key, blob in snapshot["blobs"].items():
+            self.blobs[key] = blob
+            self._blob_keys[thread_id].add(key)
+
+        self._touch(thread_id)
+        self._account(thread_id)
+
+    def _account(self, thread_id: str) -> None:
+        size = sum(
+            len(checkpoint[1]) + len(metadata[1])
+            for checkpoints in self.storage[thread_id].values()
+            for checkpoint, metadata, _ in checkpoints.values()
+        )
+        size += sum(
+            len(value[1])
+            for key in self._write_keys[thread_id]
+            for _, _, value, _ in self.writes.get(key, {}).values()
+        )
+        size += sum(len(self.blobs[key][1]) for key in self._blob_keys[thread_id])
+
+        self._total_bytes += size - self._thread_bytes.get(thread_id, 0)
+        self._thread_bytes[thread_id] = size
+
+    def _compact(self, thread_id: str, checkpoint_ns: str) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self._keep_last:
+            return
+
+        for checkpoint_id in sorted(checkpoints)[: -self._keep_last]:
+            del checkpoints[checkpoint_id]
+            write_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(write_key, None)
+            self._write_keys[thread_id].discard(write_key)
+
+        referenced = {
+            (thread_id, checkpoint_ns, channel, version)
+            for checkpoint, _, _ in checkpoints.values()
+            for channel, version in self.serde.loads_typed(checkpoint)[
+                "channel_versions"
+            ].items()
+        }
+        for key in [
+            key
+            for key in self._blob_keys[thread_id]
+            if key[1] == checkpoint_ns and key not in referenced
+        ]:
+            del self.blobs[key]
+            self._blob_keys[thread_id].discard(key)
+
+    def _forget(self, thread_id: str) -> None:
+        self.storage.pop(thread_id, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+
+        self._total_bytes -= self._thread_bytes.pop(thread_id, 0)
+        self._last_access.pop(thread_id, None)
+
+    def _evict(self, protect: str | None = None) -> None:
+        idle_before = monotonic() - self._idle_ttl
+        for thread_id, last_access in list(self._last_access.items()):
+            if (
+                last_access >= idle_before
+                and len(self._last_access) <= self._max_threads
+                and self._total_bytes <= self._max_bytes
+            ):
+                break
+
+            if thread_id == protect or self._in_flight(thread_id):
+                continue
+
+            self._forget(thread_id)
+            self.evictions += 1
+
+    def compact(self) -> None:
+        """Evicts idle threads and purges expired threads from SQLite."""
+        self._evict()
+        if self._disk is not None:
+            if purged := self._disk.purge(time() - self._sqlite_ttl):
+                logger.info(f"Purged {purged} expired threads from checkpoint store")
+
+    async def acompact(self) -> None:
+        self._evict()
+        if self._disk is not None:
+            if purged := await asyncio.to_thread(self._disk.purge, time() - self._sqlite_ttl):
+                logger.info(f"Purged {purged} expired threads from checkpoint store")
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        self._ensure_loaded(config["configurable"]["thread_id"])
+        return self._get_tuple(config)
+
+    def _get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id not in self._last_access:
+            self.storage.pop(thread_id, None)
+            return None
+
+        self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config:
+            self._ensure_loaded(config["configurable"]["thread_id"])
+
+        return super().list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        self._ensure_loaded(config["configurable"]["thread_id"])
+        return self._put(config, checkpoint, metadata, new_versions)
+
+    def _put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        self._blob_keys[thread_id].update(
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in new_versions.items()
+        )
+        self._compact(thread_id, checkpoint_ns)
+        self._touch(thread_id)
+        self._account(thread_id)
+        self._evict(protect=thread_id)
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        # Writes to an evicted thread are merged into its stored checkpoints, not persisted in their place.
+        self._ensure_loaded(config["configurable"]["thread_id"])
+        self._put_writes(config, writes, task_id, task_path)
+
+    def _put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        super().put_writes(config, writes, task_id, task_path)
+        self._write_keys[thread_id].add(
+            (
+                thread_id,
+                config["configurable"].get("checkpoint_ns", ""),
+                config["configurable"]["checkpoint_id"],
+            )
+        )
+        self._touch(thread_id)
+        self._account(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._forget(thread_id)
+        if self._disk is not None:
+            self._disk.delete(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        await self._aensure_loaded(config["configurable"]["thread_id"])
+        return self._get_tuple(config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config:
+            await self.aget_tuple(config)
+
+        for item in super().list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self._aensure_loaded(config["configurable"]["thread_id"])
+        next_config = self._put(config, checkpoint, metadata, new_versions)
+        await self._apersist(config["configurable"]["thread_id"])
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._aensure_loaded(config["configurable"]["thread_id"])
+        self._put_writes(config, writes, task_id, task_path)
+        await self._apersist(config["configurable"]["thread_id"])
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self._forget(thread_id)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.delete, thread_id)
+
+    async def _apersist(self, thread_id: str) -> None:
+        if self._disk is None or thread_id not in self._last_access:
+            return
+
+        snapshot = self._snapshot(thread_id)
+        try:
+            await asyncio.to_thread(self._disk.save, thread_id, snapshot)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist checkpoints for thread {thread_id}: {e}")
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {
+            "threads": len(self._last_access),
+            "bytes": self._total_bytes,
+            "evictions": self.evictions,
+        }
+        if self._disk is not None:
+            stats["disk"] = self._disk.stats()
+
+        return stats
@@ -0,0 +1,131 @@
+import json
+import re
+from dataclasses import dataclass
+from math import ceil
+from typing import Any
+
+from loguru import logger
+
+_LEGEND = {
+    "n": "name",
+    "b": "brand",
+    "p": "price",
+    "av": "availability",
+    "r": "average rating",
+    "rc": "total reviews",
+    "s": "customers summary",
+    "a": "review aspects as +positive/-negative mentions",
+    "u": "product url",
+}
+
+_MISSING_NOTE = "Details of the products in `missing` did not arrive in time; only their search data is known."
+
+# Each level trades detail for size: (summary chars, aspects kept).
+_LEVELS = ((400, 5), (200, 3), (80, 2), (0, 0))
+
+_DP_URL = re.compile(r"^(https?://[^/]+)/(?:[^/]+/)?dp/([A-Z0-9]{10})")
+
+
+@dataclass(slots=True, frozen=True)
+class EncodedToolResult:
+    content: str
+    tokens: int
+    full_tokens: int
+    products: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.full_tokens - self.tokens
+
+
+def estimate_tokens(text: str) -> int:
+    return ceil(len(text) / 4)
+
+
+def _truncate(text: str | None, limit: int) -> str | None:
+    if not text or limit <= 0:
+        return None
+
+    if len(text) <= limit:
+        return text
+
+    cut = text.rfind(" ", 0, limit)
+    return text[: cut if cut > 0 else limit].rstrip() + "…"
+
+
+def _short_url(url: str | None) -> str | None:
+    if url and (match := _DP_URL.match(url)):
+        return f"{match.group(1)}/dp/{match.group(2)}"
+
+    return url
+
+
+def _compact_product(product: dict[str, Any], summary_chars: int, aspects: int) -> dict[str, Any]:
+    compact = {
+        "n": product.get("name"),
+        "b": product.get("brand"),
+        "p": product.get("price"),
+        "av": product.get("availability"),
+        "r": product.get("average_rating"),
+        "rc": product.get("total_reviews"),
+        "s": _truncate(product.get("customers_summary"), summary_chars),
+        "u": _short_url(product.get("url")),
+    }
+
+    if aspects and (details := product.get("sentimental_details")):
+        top = sorted(details.items(), key=lambda item: item[1].get("total", 0), reverse=True)
+        compact["a"] = {
+            name: f"+{counts.get('positive', 0)}/-{counts.get('negative', 0)}"
+            for name, counts in top[:aspects]
+        }
+
+    return {k: v for k, v in compact.items() if v is not None}
+
+
+def _dumps(payload: dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_tool_result(
+    products: list[dict[str, Any]], *, token_budget: int, missing: list[dict[str, Any]] | None = None
+) -> EncodedToolResult:
+    """
+    Encodes search results for the LLM within `token_budget` (estimated) tokens.
+
+    Keys are shortened (a legend is included once), images and low-signal
+    fields are dropped, and summaries and review aspects are trimmed level by
+    level until the payload fits. Only as a last resort are the lowest-ranked
+    products dropped. The full data stays in the `last_search` state for the UI.
+    `missing` products, whose details were not fetched, are listed after them
+    with what search results tell about them.
+    """
+    full_tokens = estimate_tokens(
+        json.dumps({"status": "success", "last_search": products, "count": len(products)})
+    )
+
+    extra: dict[str, Any] = {}
+    if missing:
+        extra = {"missing": [_compact_product(p, 0, 0) for p in missing], "note": _MISSING_NOTE}
+
+    content = ""
+    for summary_chars, aspects in _LEVELS:
+        compact = [_compact_product(p, summary_chars, aspects) for p in products]
+        content = _dumps({"status": "success", "keys": _LEGEND, "products": compact, **extra})
+        if estimate_tokens(content) <= token_budget:
+            break
+
+    while estimate_tokens(content) > token_budget and len(compact) > 1:
+        compact.pop()
+        content = _dumps({"status": "success", "keys": _LEGEND, "products": compact, **extra})
+
+    encoded = EncodedToolResult(
+        content=content,
+        tokens=estimate_tokens(content),
+        full_tokens=full_tokens,
+        products=len(compact),
+    )
+    logger.info(
+        f"Encoded {encoded.products}/{len(products)} products in ~{encoded.tokens} tokens "
+        f"(saved ~{encoded.tokens_saved} of {encoded.full_tokens})"
+    )
+    return encoded
@@ -0,0 +1,96 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse, SummarizationMiddleware
+from langgraph.runtime import Runtime
+
+from ..core.metrics import registry
+from ..core.timing import track
+from .encoding import estimate_tokens
+
+_cancelled_calls = registry.counter(
+    "product_pulse_llm_calls_cancelled_total", "Model calls cancelled before they finished."
+)
+_tokens_saved = registry.counter(
+    "product_pulse_llm_tokens_saved_total",
+    "Estimated output tokens not generated because their model call was cancelled.",
+)
+
+# Weight of the latest completed call in the running averages.
+_ALPHA = 0.2
+
+
+def _output_tokens(response: ModelResponse) -> int:
+    tokens = 0
+    for message in response.result:
+        usage = getattr(message, "usage_metadata", None)
+        tokens += usage["output_tokens"] if usage else estimate_tokens(message.text)
+
+    return tokens
+
+
+class TimingMiddleware(AgentMiddleware):
+    """
+    Attributes model calls to the `llm` stage of the current request.
+
+    It also keeps running averages of output tokens and duration per call.
+    When a call is cancelled, e.g. because the client went away, the
+    remaining share of an average call is counted as tokens saved.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._avg_tokens = 0.0
+        self._avg_seconds = 0.0
+
+    def wrap_model_call(
+        self, request: ModelRequest, handler: Callable[[ModelRequest], ModelResponse]
+    ) -> ModelResponse:
+        with track("llm"):
+            return handler(request)
+
+    async def awrap_model_call(
+        self, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[ModelResponse]]
+    ) -> ModelResponse:
+        started_at = perf_counter()
+        try:
+            with track("llm"):
+                response = await handler(request)
+        except asyncio.CancelledError:
+            self._cancelled(perf_counter() - started_at)
+            raise
+
+        self._completed(_output_tokens(response), perf_counter() - started_at)
+        return response
+
+    def _completed(self, tokens: int, elapsed: float) -> None:
+        if self._avg_seconds == 0.0:
+            self._avg_tokens, self._avg_seconds = float(tokens), elapsed
+            return
+
+        self._avg_tokens += _ALPHA * (tokens - self._avg_tokens)
+        self._avg_seconds += _ALPHA * (elapsed - self._avg_seconds)
+
+    def _cancelled(self, elapsed: float) -> None:
+        _cancelled_calls.inc()
+        if self._avg_seconds > 0.0:
+            _tokens_saved.inc(self._avg_tokens * max(0.0, 1.0 - elapsed / self._avg_seconds))
+
+
+class TimedSummarizationMiddleware(SummarizationMiddleware):
+    """SummarizationMiddleware whose checks and summary calls count as the `summarization` stage."""
+
+    @property
+    def name(self) -> str:
+        # Keeps the graph node names, and so existing checkpoints, unchanged.
+        return SummarizationMiddleware.__name__
+
+    def before_model(self, state: Any, runtime: Runtime) -> dict[str, Any] | None:
+        with track("summarization"):
+            return super().before_model(state, runtime)
+
+    async def abefore_model(self, state: Any, runtime: Runtime) -> dict[str, Any] | None:
+        with track("summarization"):
+            return await super().abefore_model(state, runtime)
@@ -1,4 +1,3 @@
-import asyncio
 import json
 from typing import Any
 
@@ -7,16 +6,26 @@ from langchain.tools import ToolRuntime, tool
 from langgraph.types import Command
 from loguru import logger
 
+from ...core.config import app_config
+from ...core.models.amazon_product_details import AmazonProductDetails
+from ...core.timing import track
 from ...services.scraperapi_service import ScraperAPIService
-from ...decorators import with_timer, with_semaphore
+from ...decorators import with_timer
+from ..encoding import encode_tool_result
+
+
+def _with_limits(func):
+    # Fills the configured limits into the docstring, which is the tool's description for the LLM.
+    func.__doc__ = func.__doc__.format(max_queries=app_config.AGENT.SEARCH_MAX_QUERIES)
+    return func
 
 
 @tool
 @with_timer
-@with_semaphore(semaphore=asyncio.Semaphore(2))
+@_with_limits
 async def search_on_amazon(
     runtime: ToolRuntime,
-    query: str,
+    queries: list[str],
     top_n_products: int = 5,
     min_rating: float | None = None,
     min_price: float | None = None,
@@ -25,10 +34,12 @@ async def search_on_amazon(
     best_sellers_only: bool = False,
 ) -> Command:
     """
-    Search for products on Amazon and return enriched product data with optional filters.
+    Search for products on Amazon with one or more queries and return enriched product data with optional filters.
 
     Args:
-        query: Short search query (2-5 words). Examples: "gaming mouse", "iPhone 15 case", "wireless headphones".
+        queries: 1-{max_queries} short search queries (2-5 words each), searched concurrently and merged into one ranking.
+            Give several to cover alternatives in a single call. Examples: ["gaming mouse"],
+            ["wireless earbuds", "noise cancelling earbuds", "sport earbuds"].
         top_n_products: Number of top products to return (default 5).
         min_rating: Minimum star rating filter (e.g., 4.0 or 4.5).
         min_price: Minimum price in dollars.
@@ -39,54 +50,65 @@ async def search_on_amazon(
     Returns:
         dict with status, last_search results, and all_searches history.
     """
+    # Case-insensitive duplicates would only search the same thing twice.
+    queries = list({" ".join(q.split()).lower(): q.strip() for q in queries if q.strip()}.values())
+    queries = queries[: app_config.AGENT.SEARCH_MAX_QUERIES]
+    if not queries:
+        return {"status": "success", "message": "No search query given"}
+
     try:
         async with ScraperAPIService() as scraper_api:
-            search_result = await scraper_api.search_product_on_amazon(
-                query=query, region=runtime.state.get("region")
+            products = await scraper_api.find_products_for_queries(
+                queries=queries,
+                region=runtime.state.get("region"),
+                limit=top_n_products,
+                min_rating=min_rating,
+                min_price=min_price,
+                max_price=max_price,
+                prime_only=prime_only,
+                best_sellers_only=best_sellers_only,
             )
 
-            products = search_result.results
-
-            if prime_only:
-                products = [p for p in products if p.has_prime]
-
-            if best_sellers_only:
-                products = [p for p in products if p.is_best_seller]
-
-            if min_rating is not None:
-                products = [p for p in products if p.stars and p.stars >= min_rating]
-
-            if min_price is not None or max_price is not None:
-                min_p = min_price if min_price is not None else 0
-                max_p = max_price if max_price is not None else float("inf")
-                products = [
-                    p for p in products if p.price and min_p <= p.price <= max_p
-                ]
-
-            products = products[:top_n_products]
-
             if not products:
                 return {"status": "success", "message": "No products found matching criteria"}
 
-            product_details = await scraper_api.get_products_details(search_results=products)
+            # Cards are streamed in completion order but kept in search rank for the LLM.
+            rank = {product.asin: index for index, product in enumerate(products)}
 
-            if not product_details:
-                return {"status": "success", "message": "No product details available"}
+            def stream_card(asin: str, details: AmazonProductDetails) -> None:
+                runtime.stream_writer(
+                    {"type": "product", "rank": rank[asin], "product": details.to_chatbot_view().model_dump()}
+                )
 
-            chatbot_views = [product.to_chatbot_view() for product in product_details]
+            with track("details"):
+                batch = await scraper_api.get_products_details(
+                    products, region=runtime.state.get("region"), on_details=stream_card
+                )
 
-        products_data = [view.model_dump() for view in chatbot_views]
+            if not batch.products and not batch.missing:
+                return {"status": "success", "message": "No product details available"}
+
+        with track("encode"):
+            products_data = [details.to_chatbot_view().model_dump() for details in batch.products]
+            # Products cut by the deadline still reach the LLM with their search data.
+            missing = set(batch.missing)
+            missing_data = [
+                {"name": p.name, "price": p.price_string, "average_rating": p.stars, "url": str(p.url)}
+                for p in products
+                if p.asin in missing
+            ]
+            encoded = encode_tool_result(
+                products_data, token_budget=app_config.AGENT.TOOL_RESULT_TOKEN_BUDGET, missing=missing_data
+            )
 
         return Command(
             update={
                 "messages": [ToolMessage(
-                    content=json.dumps({
-                        "status": "success", 
-                        "last_search": products_data,
-                        "count": len(products_data)
-                    }),
+                    content=encoded.content,
                     tool_call_id=runtime.tool_call_id,
-                    status="success"
+                    status="success",
+                    # Marks a partial result, which is not worth caching.
+                    artifact={"missing": batch.missing} if batch.missing else None,
                 )],
                 "last_search": products_data,
             }
@@ -94,5 +116,16 @@ async def search_on_amazon(
 
     except Exception as e:
         logger.error(f"Error searching on Amazon: {str(e)}")
-        return {"status": "error", "error": "An error occurred while searching on Amazon"}
+        # Marked as an error, unlike a plain return, so the failed turn is never cached.
+        return Command(
+            update={
+                "messages": [ToolMessage(
+                    content=json.dumps(
+                        {"status": "error", "error": "An error occurred while searching on Amazon"}
+                    ),
+                    tool_call_id=runtime.tool_call_id,
+                    status="error"
+                )],
+            }
+        )
 
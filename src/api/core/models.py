@@ -1,6 +1,13 @@
-from typing import Any, TypedDict
+from typing import Annotated, Any, TypedDict
+from uuid import uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field, StringConstraints
+
+from ...core.config import app_config
+
+Asin = Annotated[
+    str, StringConstraints(strip_whitespace=True, pattern=r"^[0-9A-Za-z]{10}$"), AfterValidator(str.upper)
+]
 
 
 class Message(BaseModel):
@@ -16,8 +23,14 @@ class LangGraphInput(TypedDict):
 class ChatRequest(BaseModel):
     messages: list[Message]
     region: str | None = Field(default=None)
-    thread_id: str | None = Field(default="default")
+    # A request without one starts a new conversation; responses carry the id to continue it.
+    thread_id: str = Field(default_factory=lambda: uuid4().hex)
     stream_mode: list[str] | None = Field(default=["values"])
+    # Delta mode: `messages` holds only what was written after this message,
+    # the `message_id` of the previous response.
+    last_message_id: str | None = Field(default=None)
+    # Seconds the turn may take from when the server receives it; `AGENT_DEADLINE` when not set.
+    deadline: float | None = Field(default=None, gt=0, le=app_config.AGENT.DEADLINE_MAX)
 
     def to_langgraph_input(self) -> LangGraphInput:
         return {
@@ -33,11 +46,18 @@ class ChatResponse(BaseModel):
     content: str
     role: str
     last_search: list[dict[str, Any]] | None = Field(default=None)
+    message_id: str | None = Field(default=None)
+    thread_id: str | None = Field(default=None)
+    # True when the answer was replayed from the response cache.
+    cached: bool = Field(default=False)
 
     @classmethod
-    def build_from_state(cls, state: dict[str, Any]) -> "ChatResponse":
+    def build_from_state(
+        cls, state: dict[str, Any], thread_id: str | None = None, cached: bool = False
+    ) -> "ChatResponse":
+        messages = state.get("messages", [])
         _last_ai_message = next(
-            (msg.content for msg in reversed(state.get("messages", [])) if hasattr(msg, "type") and msg.type == "ai"),
+            (msg.content for msg in reversed(messages) if hasattr(msg, "type") and msg.type == "ai"),
             None
         )
 
@@ -45,4 +65,24 @@ class ChatResponse(BaseModel):
             content=_last_ai_message,
             role="ai",
             last_search=state.get("last_search", None),
-        )
\ No newline at end of file
+            message_id=getattr(messages[-1], "id", None) if messages else None,
+            thread_id=thread_id,
+            cached=cached,
+        )
+
+class ProductSearchRequest(BaseModel):
+    query: str = Field(min_length=1)
+    region: str | None = Field(default=None)
+    top_n_products: int = Field(default=5, ge=1, le=app_config.PRODUCTS.MAX_RESULTS)
+    min_rating: float | None = Field(default=None)
+    min_price: float | None = Field(default=None)
+    max_price: float | None = Field(default=None)
+    prime_only: bool = Field(default=False)
+    best_sellers_only: bool = Field(default=False)
+    # Without details only the search results are returned, which costs no product calls.
+    details: bool = Field(default=True)
+
+
+class ProductDetailsRequest(BaseModel):
+    asins: list[Asin] = Field(min_length=1, max_length=app_config.PRODUCTS.MAX_BATCH)
+    region: str | None = Field(default=None)
@@ -0,0 +1,22 @@
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose background task runs however the response ends.
+
+    Starlette skips the task when sending fails, e.g. with ASGI 2.4+ servers
+    when the client is gone before the body starts. The body's own `finally`
+    does not run either then, since it never started, so a task that releases
+    what the request holds must not be skipped. Release tasks have to be
+    idempotent: on a normal end both the body and the task release.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        background, self.background = self.background, None
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if background is not None:
+                await background()
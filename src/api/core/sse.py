@@ -0,0 +1,71 @@
+import json
+from json.encoder import encode_basestring_ascii
+from time import monotonic
+from typing import Any
+
+from pydantic import BaseModel
+
+SSE_DONE = "data: [DONE]\n\n"
+
+
+def sse_event(payload: dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def sse_token(delta: str) -> str:
+    # Tokens are the hot path: skip building a dict and let the C encoder escape the text.
+    return 'data: {"type": "token", "delta": ' + encode_basestring_ascii(delta) + "}\n\n"
+
+
+def sse_model(type_: str, key: str, model: BaseModel) -> str:
+    return f'data: {{"type": "{type_}", "{key}": {model.model_dump_json()}}}\n\n'
+
+
+class TokenCoalescer:
+    """
+    Buffers streamed tokens into larger SSE frames.
+
+    A frame is flushed once `max_chars` characters are buffered or the oldest
+    buffered token is `max_delay` seconds old. `max_chars=0` disables
+    coalescing and emits one frame per token.
+    """
+
+    __slots__ = ("_max_chars", "_max_delay", "_parts", "_size", "_started_at", "frames", "tokens")
+
+    def __init__(self, *, max_chars: int, max_delay: float) -> None:
+        self._max_chars = max_chars
+        self._max_delay = max_delay
+        self._parts: list[str] = []
+        self._size = 0
+        self._started_at = 0.0
+        self.frames = 0
+        self.tokens = 0
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._parts)
+
+    def time_left(self) -> float:
+        return max(0.0, self._started_at + self._max_delay - monotonic())
+
+    def add(self, token: str) -> str | None:
+        self.tokens += 1
+        if not self._parts:
+            self._started_at = monotonic()
+
+        self._parts.append(token)
+        self._size += len(token)
+        if self._size >= self._max_chars or self.time_left() <= 0:
+            return self.flush()
+
+        return None
+
+    def flush(self) -> str | None:
+        if not self._parts:
+            return None
+
+        delta = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        self.frames += 1
+        return sse_token(delta)
@@ -1,59 +1,92 @@
-from fastapi import Request, status
+import hmac
+from collections.abc import Iterable
+
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from ...core.config import app_config
 
 
-class BearerAuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, excluded_paths: tuple[str] | None = None) -> None:
-        super().__init__(app)
-        self._excluded_paths = excluded_paths or (
-            "/docs",
-            "/redoc",
-            "/openapi.json",
+def _configured_tokens() -> list[str]:
+    tokens = [app_config.SERVER.TOKEN.get_secret_value()]
+    if app_config.SERVER.ROTATION_TOKENS is not None:
+        tokens += app_config.SERVER.ROTATION_TOKENS.get_secret_value().split(",")
+
+    return [token.strip() for token in tokens if token.strip()]
+
+
+class BearerAuthMiddleware:
+    """
+    Pure ASGI bearer token check.
+
+    Unlike `BaseHTTPMiddleware`, accepted requests are handed to the app
+    untouched, so streaming responses are not re-wrapped through a task and
+    memory stream. Accepted tokens are read once, when the middleware is
+    built; `SERVER_ROTATION_TOKENS` lists extra comma-separated tokens that
+    stay valid while clients move to a new `SERVER_TOKEN`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        excluded_paths: Iterable[str] | None = None,
+        tokens: Iterable[str] | None = None,
+    ) -> None:
+        self.app = app
+        self._excluded_paths = frozenset(
+            excluded_paths or ("/docs", "/redoc", "/openapi.json")
         )
+        self._tokens = [
+            token.encode() for token in (tokens if tokens is not None else _configured_tokens())
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self._excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if (error := self._authenticate(scope)) is not None:
+            await error(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        if request.url.path in self._excluded_paths:
-            return await call_next(request)
+        await self.app(scope, receive, send)
 
-        auth_header = request.headers.get("Authorization")
+    def _authenticate(self, scope: Scope) -> JSONResponse | None:
+        auth_header = next(
+            (value for name, value in scope["headers"] if name == b"authorization"), None
+        )
         if not auth_header:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Authorization header missing"},
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            return self._unauthorized("Authorization header missing")
 
         try:
             scheme, token = auth_header.split()
-            if scheme.lower() != "bearer":
-                return JSONResponse(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    content={"detail": "Invalid authentication scheme"},
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-
         except ValueError:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Invalid Authorization header format"},
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            return self._unauthorized("Invalid Authorization header format")
+
+        if scheme.lower() != b"bearer":
+            return self._unauthorized("Invalid authentication scheme")
 
-        expected_token = app_config.SERVER.TOKEN.get_secret_value()
-        if not expected_token:
+        if not self._tokens:
             return JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={"detail": "Server configuration error: AUTH_TOKEN not set"},
             )
 
-        if token != expected_token:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"detail": "Incorrect Bearer Token"},
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        # Every configured token is compared, so timing reveals neither a match nor which one.
+        matched = False
+        for expected in self._tokens:
+            matched |= hmac.compare_digest(token, expected)
+
+        if not matched:
+            return self._unauthorized("Incorrect Bearer Token")
 
-        return await call_next(request)
+        return None
+
+    @staticmethod
+    def _unauthorized(detail: str) -> JSONResponse:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content={"detail": detail},
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,23 +1,239 @@
 import asyncio
 import json
-from typing import Any, AsyncGenerator
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncGenerator
 
 from loguru import logger
 
-from ...agent import agent
+from ...agent import aget_agent, thread_scheduler
+from ...core.config import app_config
+from ...core.deadline import Deadline, set_deadline
+from ...core.metrics import registry
+from ...core.thread_scheduler import SUPERSEDED, ThreadLease
+from ...core.timing import RequestTiming, start_request_timing, track, use_request_timing
 from ..core.models import ChatRequest, ChatResponse
+from ..core.sse import SSE_DONE, TokenCoalescer, sse_event, sse_model
+from .history import new_messages
+from .response_cache import CachedResponse, cacheable_turn, get_response_cache, response_key
 from ...decorators import with_timer
 
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+_active_streams = registry.gauge(
+    "product_pulse_active_streams", "SSE streams currently open, by pipeline.", labelnames=("pipeline",)
+)
+
+_disconnects = registry.counter(
+    "product_pulse_stream_disconnects_total", "Streams closed by the client before their run finished."
+)
+
+_CANCELLED_TOOL_RESULT = "Cancelled: the client disconnected before this tool finished."
+
+# Cleanups of abandoned runs; referenced so they are not garbage collected mid-way.
+_abandoned: set[asyncio.Task] = set()
+
+# Words with their trailing whitespace: the "tokens" of a replayed answer.
+_REPLAY_TOKEN = re.compile(r"\s*\S+\s*")
+
+
+def _bound_tools(deadline: Deadline | None) -> None:
+    """
+    Gives the run's tools the request's deadline, less a reserve (at most
+    half of what is left) for the model to answer with what they found.
+    """
+    if deadline is not None:
+        deadline = deadline.earlier(min(app_config.AGENT.DEADLINE_RESERVE, deadline.remaining() / 2))
+
+    set_deadline(deadline)
+
+
+def _resume_timing(timing: RequestTiming | None) -> RequestTiming:
+    """The timing the endpoint started, so the stream's stages add to its queue and lookup stages."""
+    if timing is None:
+        return start_request_timing()
+
+    use_request_timing(timing)
+    return timing
+
+
+@lru_cache(maxsize=1)
+def _final_node(agent: "CompiledStateGraph") -> str:
+    # The node a finished run ends on; a state update made as this node leaves nothing to run next.
+    # Imported here: langgraph.graph alone would add a third to the server's import time.
+    from langgraph.graph import END
+
+    return next(edge.source for edge in agent.get_graph().edges if edge.target == END and edge.source != "tools")
+
+class _GraphSteps:
+    """
+    Advances a graph stream one step at a time, each step in a task of its own.
+
+    Pipelines only wait on those tasks. When a client disconnects, Starlette
+    keeps cancelling every await in the response's body task. If the body
+    task drove the stream itself, LangGraph could not cancel its running
+    nodes, and the model call or tool would go on in the background.
+    """
+
+    __slots__ = ("_stream", "_pending")
+
+    def __init__(self, stream: AsyncGenerator) -> None:
+        self._stream = stream
+        self._pending: asyncio.Future | None = None
+
+    def next(self) -> asyncio.Future:
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(anext(self._stream))
+        return self._pending
+
+    def take(self) -> Any:
+        """Result of the finished step; raises `StopAsyncIteration` at the end of the stream."""
+        step, self._pending = self._pending, None
+        return step.result()
+
+    async def aclose(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()
+            await asyncio.wait((self._pending,))
+        await self._stream.aclose()
+
 
 class AgentService:
+    @staticmethod
+    async def acquire_thread(request: ChatRequest) -> ThreadLease:
+        """
+        Waits for the request's thread to be free, so runs on one thread never
+        overlap. Raises `ThreadBusyError` when the scheduler's policy refuses it.
+        """
+        with track("queue"):
+            return await thread_scheduler.acquire(request.thread_id)
+
+    @staticmethod
+    async def resolve_history(request: ChatRequest) -> ChatRequest:
+        """
+        Drops the messages the stored thread already has, so the agent only
+        receives this turn's input. Raises `HistoryConflictError` when the
+        client's history diverged from the thread.
+        """
+        agent = await aget_agent()
+        with track("history"):
+            snapshot = await agent.aget_state(request.get_config())
+            stored = snapshot.values.get("messages", []) if snapshot.values else []
+            return request.model_copy(update={"messages": new_messages(request, stored)})
+
+    @staticmethod
+    async def lookup_response(request: ChatRequest) -> tuple[str | None, CachedResponse | None]:
+        """
+        The response cache key of this turn and the answer cached under it,
+        or the answer is None on a miss. Both are None when the cache is off.
+        """
+        if (cache := get_response_cache()) is None:
+            return None, None
+
+        agent = await aget_agent()
+        with track("cache"):
+            snapshot = await agent.aget_state(request.get_config())
+            stored = snapshot.values.get("messages", []) if snapshot.values else []
+            key = response_key(request.region, stored, request.messages)
+            return key, await cache.get(key)
+
+    @staticmethod
+    async def replay_response(request: ChatRequest, cached: CachedResponse) -> dict[str, Any]:
+        """
+        Adds a cached turn to the request's thread as if the agent had run it,
+        so the conversation continues normally, and returns the new state.
+        """
+        agent = await aget_agent()
+        config = request.get_config()
+        update: dict[str, Any] = dict(request.to_langgraph_input())
+        update["messages"] = [*update["messages"], *cached.to_messages()]
+        if cached.last_search is not None:
+            update["last_search"] = cached.last_search
+
+        await agent.aupdate_state(config, update, as_node=_final_node(agent))
+        snapshot = await agent.aget_state(config)
+        return snapshot.values
+
+    @staticmethod
+    async def remember_response(cache_key: str | None, state: dict[str, Any]) -> None:
+        """Caches the turn a run just finished under `cache_key`, if it can be replayed."""
+        if cache_key is None or (cache := get_response_cache()) is None:
+            return
+
+        try:
+            if (response := cacheable_turn(state)) is not None:
+                await cache.put(cache_key, response)
+        except Exception as e:
+            logger.warning(f"Failed to cache a response: {e}")
+
+    @staticmethod
+    async def settle_thread(request: ChatRequest) -> None:
+        """
+        Answers the tool calls a cancelled run left open. The model rejects a
+        history with unanswered tool calls, so without this the thread could
+        not be continued.
+        """
+        from langchain_core.messages import ToolMessage
+
+        agent = await aget_agent()
+        config = request.get_config()
+        snapshot = await agent.aget_state(config)
+        messages = snapshot.values.get("messages", []) if snapshot.values else []
+        last_ai = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].type == "ai"), None)
+        if last_ai is None:
+            return
+
+        answered = {message.tool_call_id for message in messages[last_ai + 1 :] if message.type == "tool"}
+        missing = [call for call in messages[last_ai].tool_calls if call["id"] not in answered]
+        if missing:
+            await agent.aupdate_state(
+                config,
+                {
+                    "messages": [
+                        ToolMessage(
+                            content=_CANCELLED_TOOL_RESULT, tool_call_id=call["id"], name=call["name"], status="error"
+                        )
+                        for call in missing
+                    ]
+                },
+                as_node="tools",
+            )
+
+    @staticmethod
+    def _abandon(request: ChatRequest, steps: _GraphSteps, lease: ThreadLease) -> None:
+        """
+        Stops a run nobody reads anymore and settles its thread before the
+        lease is released. This runs in its own task, for the same reason
+        as `_GraphSteps`.
+        """
+
+        async def abandon() -> None:
+            try:
+                await steps.aclose()
+                await AgentService.settle_thread(request)
+            except Exception as e:
+                logger.warning(f"Failed to settle thread {request.thread_id} after an abandoned run: {e}")
+            finally:
+                lease.release()
+
+        task = asyncio.create_task(abandon())
+        _abandoned.add(task)
+        task.add_done_callback(_abandoned.discard)
+
     @staticmethod
     @with_timer
-    async def run_agent(request: ChatRequest) -> dict[str, Any]:
+    async def run_agent(
+        request: ChatRequest, cache_key: str | None = None, deadline: Deadline | None = None
+    ) -> dict[str, Any]:
         try:
+            _bound_tools(deadline)
+            agent = await aget_agent()
             response = await agent.ainvoke(
                 request.to_langgraph_input(),
                 config=request.get_config(),
             )
+            await AgentService.remember_response(cache_key, response)
             return response
 
         except Exception as e:
@@ -25,16 +241,235 @@ class AgentService:
             raise
 
     @staticmethod
-    @with_timer
-    async def stream_agent(request: ChatRequest) -> AsyncGenerator[str, None]:
+    def stream_agent(
+        request: ChatRequest,
+        lease: ThreadLease,
+        cache_key: str | None = None,
+        cached: CachedResponse | None = None,
+        deadline: Deadline | None = None,
+        timing: RequestTiming | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streams a run; `lease` is released when the stream ends. A `cached`
+        turn is replayed instead, and a run's turn is cached under `cache_key`.
+        The run's tools give up on upstream work that outlasts `deadline`.
+        Stages are added to `timing`, the one the endpoint started, if given.
+        """
+        if cached is not None:
+            return AgentService._stream_cached(request=request, lease=lease, cached=cached, timing=timing)
+
+        if app_config.AGENT.STREAM_PIPELINE == "events":
+            return AgentService._stream_events(
+                request=request, lease=lease, cache_key=cache_key, deadline=deadline, timing=timing
+            )
+
+        return AgentService._stream_messages(
+            request=request, lease=lease, cache_key=cache_key, deadline=deadline, timing=timing
+        )
+
+    @staticmethod
+    async def _stream_cached(
+        request: ChatRequest, lease: ThreadLease, cached: CachedResponse, timing: RequestTiming | None = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Replays a cached turn with the frames a live run sends: product cards,
+        then the answer in token frames, then the final state.
+        """
+        lease.adopt()
+        if lease.superseded:
+            lease.release()
+            yield sse_event({"type": "error", "error": SUPERSEDED})
+            return
+
+        timing = _resume_timing(timing)
+        coalescer = TokenCoalescer(
+            max_chars=app_config.AGENT.STREAM_FLUSH_CHARS, max_delay=app_config.AGENT.STREAM_FLUSH_INTERVAL
+        )
+        try:
+            with track("cache"):
+                state = await AgentService.replay_response(request, cached)
+
+            for rank, product in enumerate(cached.last_search or []):
+                yield sse_event({"type": "product", "rank": rank, "product": product})
+
+            for token in _REPLAY_TOKEN.findall(cached.text):
+                if frame := coalescer.add(token):
+                    yield frame
+            if frame := coalescer.flush():
+                yield frame
+
+            with track("serialize"):
+                frame = sse_model(
+                    "final_state",
+                    "state",
+                    ChatResponse.build_from_state(state=state, thread_id=request.thread_id, cached=True),
+                )
+            yield frame
+
+            yield sse_event({"type": "timing", **timing.as_dict()})
+            yield SSE_DONE
+
+        except asyncio.CancelledError:
+            if not lease.absorb():
+                _disconnects.inc()
+                raise
+            yield sse_event({"type": "error", "error": SUPERSEDED})
+
+        except GeneratorExit:
+            _disconnects.inc()
+            raise
+
+        except Exception as e:
+            yield sse_event({"type": "error", "error": str(e)})
+
+        finally:
+            lease.release()
+
+    @staticmethod
+    async def _stream_messages(
+        request: ChatRequest,
+        lease: ThreadLease,
+        cache_key: str | None = None,
+        deadline: Deadline | None = None,
+        timing: RequestTiming | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streams through LangGraph's `messages`, `custom` and `values` modes.
+
+        Unlike `astream_events`, no event is built per runnable start/end.
+        Tokens from the agent's model node are coalesced into frames, which are
+        flushed by size or age; the age flush fires even while the model pauses.
+        """
+        from langchain_core.messages import AIMessageChunk
+
+        agent = await aget_agent()
+        lease.adopt()
+        if lease.superseded:
+            lease.release()
+            yield sse_event({"type": "error", "error": SUPERSEDED})
+            return
+
+        timing = _resume_timing(timing)
+        _bound_tools(deadline)
+        coalescer = TokenCoalescer(
+            max_chars=app_config.AGENT.STREAM_FLUSH_CHARS,
+            max_delay=app_config.AGENT.STREAM_FLUSH_INTERVAL,
+        )
+        steps = _GraphSteps(
+            agent.astream(
+                request.to_langgraph_input(),
+                config=request.get_config(),
+                stream_mode=["messages", "custom", "values"],
+            )
+        )
         final_state: dict[str, Any] | None = None
+        finished = False
+        active = _active_streams.labels("messages")
+        active.inc()
         try:
-            async for event in agent.astream_events(
+            while True:
+                done, _ = await asyncio.wait(
+                    (steps.next(),), timeout=coalescer.time_left() if coalescer.pending else None
+                )
+                if not done:
+                    yield coalescer.flush()
+                    continue
+
+                mode, chunk = steps.take()
+
+                if mode == "messages":
+                    message, metadata = chunk
+                    if (
+                        metadata.get("langgraph_node") == "model"
+                        and isinstance(message, AIMessageChunk)
+                        and (token := message.text)
+                        and (frame := coalescer.add(token))
+                    ):
+                        yield frame
+
+                elif mode == "custom":
+                    if frame := coalescer.flush():
+                        yield frame
+                    yield sse_event(chunk)
+
+                elif mode == "values":
+                    final_state = chunk
+
+        except StopAsyncIteration:
+            finished = True
+            if frame := coalescer.flush():
+                yield frame
+
+            if final_state:
+                with track("serialize"):
+                    frame = sse_model(
+                        "final_state",
+                        "state",
+                        ChatResponse.build_from_state(state=final_state, thread_id=request.thread_id),
+                    )
+                yield frame
+                await AgentService.remember_response(cache_key, final_state)
+
+            yield sse_event({"type": "timing", **timing.as_dict()})
+            yield SSE_DONE
+
+        except asyncio.CancelledError:
+            if not lease.absorb():
+                _disconnects.inc()
+                raise
+            yield sse_event({"type": "error", "error": SUPERSEDED})
+
+        except GeneratorExit:
+            _disconnects.inc()
+            raise
+
+        except Exception as e:
+            yield sse_event({"type": "error", "error": str(e)})
+
+        finally:
+            active.dec()
+            if finished:
+                lease.release()
+            else:
+                AgentService._abandon(request, steps, lease)
+
+    @staticmethod
+    async def _stream_events(
+        request: ChatRequest,
+        lease: ThreadLease,
+        cache_key: str | None = None,
+        deadline: Deadline | None = None,
+        timing: RequestTiming | None = None,
+    ) -> AsyncGenerator[str, None]:
+        agent = await aget_agent()
+        lease.adopt()
+        if lease.superseded:
+            lease.release()
+            yield sse_event({"type": "error", "error": SUPERSEDED})
+            return
+
+        timing = _resume_timing(timing)
+        _bound_tools(deadline)
+        final_state: dict[str, Any] | None = None
+        finished = False
+        steps = _GraphSteps(
+            agent.astream_events(
                 input=request.to_langgraph_input(),
                 config=request.get_config(),
                 stream_mode=request.stream_mode,
                 version="v2"
-            ):
+            )
+        )
+        active = _active_streams.labels("events")
+        active.inc()
+        try:
+            while True:
+                await asyncio.wait((steps.next(),))
+                try:
+                    event = steps.take()
+                except StopAsyncIteration:
+                    break
+
                 event_type = event.get("event")
                 data = event.get("data", {})
                 chunk = data.get("chunk")
@@ -47,18 +482,49 @@ class AgentService:
                     token = event["data"]["chunk"].content
                     yield f"data: {json.dumps({'type': 'token', 'delta': token})}\n\n"
 
+                if (
+                    event_type == "on_chain_stream"
+                    and not event.get("parent_ids")
+                    and isinstance(chunk, tuple)
+                    and chunk[0] == "custom"
+                    and chunk[1].get("type") == "product"
+                ):
+                    yield f"data: {json.dumps(chunk[1])}\n\n"
+
                 if event_type == "on_chain_end":
                     final_state = data.get("output")
 
                 if event_type == "on_graph_state":
                     final_state = data
 
+            finished = True
             if final_state:
-                final_response = ChatResponse.build_from_state(state=final_state)
-                yield f"data: {json.dumps({'type': 'final_state', 'state': final_response.model_dump()})}\n\n"
-            
+                with track("serialize"):
+                    final_response = ChatResponse.build_from_state(state=final_state, thread_id=request.thread_id)
+                    frame = f"data: {json.dumps({'type': 'final_state', 'state': final_response.model_dump()})}\n\n"
+                yield frame
+                await AgentService.remember_response(cache_key, final_state)
+
+            yield f"data: {json.dumps({'type': 'timing', **timing.as_dict()})}\n\n"
             yield "data: [DONE]\n\n"
-                
+
+        except asyncio.CancelledError:
+            if not lease.absorb():
+                _disconnects.inc()
+                raise
+            yield sse_event({"type": "error", "error": SUPERSEDED})
+
+        except GeneratorExit:
+            _disconnects.inc()
+            raise
+
         except Exception as e:
             error_data = {"type": "error", "error": str(e)}
-            yield f"data: {json.dumps(error_data)}\n\n"
\ No newline at end of file
+            yield f"data: {json.dumps(error_data)}\n\n"
+
+        finally:
+            active.dec()
+            if finished:
+                lease.release()
+            else:
+                AgentService._abandon(request, steps, lease)
\ No newline at end of file
@@ -0,0 +1,86 @@
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from ...core.metrics import registry
+from ..core.models import ChatRequest, Message
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+ROLE_TYPES = {"user": "human", "human": "human", "assistant": "ai", "ai": "ai", "system": "system"}
+
+_history_messages = registry.counter(
+    "product_pulse_history_messages_total",
+    "Client messages sent to the agent or dropped as already stored in the thread.",
+    labelnames=("result",),
+)
+_history_conflicts = registry.counter(
+    "product_pulse_history_conflicts_total",
+    "Delta requests rejected because they do not continue the stored thread.",
+)
+
+
+class HistoryConflictError(Exception):
+    """The client's history does not continue the stored thread."""
+
+    def __init__(self, detail: str, last_message_id: str | None) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.last_message_id = last_message_id
+
+
+def is_visible(message: "BaseMessage") -> bool:
+    # What a chat client can have rendered: user turns and final answers, not tool traffic.
+    return message.type in ("human", "ai") and not getattr(message, "tool_calls", None) and bool(message.text)
+
+
+def _matches(client: Message, stored: "BaseMessage") -> bool:
+    if ROLE_TYPES.get(client.role, client.role) != stored.type:
+        return False
+
+    content, text = client.content.strip(), stored.text.strip()
+    # Streamed answers may also carry text the model wrote before calling a tool.
+    return content == text or (stored.type == "ai" and content.endswith(text))
+
+
+def new_messages(request: ChatRequest, stored: Sequence["BaseMessage"]) -> list[Message]:
+    """
+    Returns the messages of `request` the stored thread does not have yet.
+
+    With `last_message_id`, the request must continue the thread from its
+    latest message. Without it, the request carries the whole history, which
+    is aligned on the thread's latest visible message and only what follows
+    it is kept; messages that do not contain it are all new, which is how
+    clients that send one message per turn have always worked. Raises
+    `HistoryConflictError` when a delta does not continue the thread.
+    """
+    last_stored_id = stored[-1].id if stored else None
+
+    if request.last_message_id is not None:
+        if request.last_message_id != last_stored_id:
+            _history_conflicts.inc()
+            detail = (
+                "Thread has newer messages than last_message_id"
+                if any(message.id == request.last_message_id for message in stored)
+                else "last_message_id is not part of this thread"
+            )
+            raise HistoryConflictError(detail, last_stored_id)
+
+        fresh = request.messages
+    else:
+        anchor = next((message for message in reversed(stored) if is_visible(message)), None)
+        if anchor is None:
+            fresh = request.messages
+        else:
+            position = next(
+                (i for i in range(len(request.messages) - 1, -1, -1) if _matches(request.messages[i], anchor)),
+                None,
+            )
+            fresh = request.messages if position is None else request.messages[position + 1 :]
+
+    if not fresh:
+        raise HistoryConflictError("No new messages after the stored thread", last_stored_id)
+
+    _history_messages.labels("new").inc(len(fresh))
+    _history_messages.labels("deduplicated").inc(len(request.messages) - len(fresh))
+    return fresh
@@ -0,0 +1,209 @@
+import json
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import Any
+
+from httpx import HTTPStatusError, RequestError
+from tenacity import RetryError
+
+from ...core.config import app_config
+from ...core.metrics import registry
+from ...core.models.amazon_product_details import AmazonProductDetails
+from ...core.models.amazon_search_result import SearchProduct
+from ...core.timing import RequestTiming, track
+from ...services.scraperapi_service import ScraperAPIService, product_url
+from ..core.models import ProductDetailsRequest, ProductSearchRequest
+
+NDJSON = "application/x-ndjson"
+
+_in_flight = registry.gauge("product_pulse_products_in_flight", "Products API requests being served.")
+_rejected = registry.counter(
+    "product_pulse_products_rejected_total", "Products API requests turned away because too many were in flight."
+)
+_lookups = registry.counter(
+    "product_pulse_product_lookups_total",
+    "Product detail lookups made by the products API, by endpoint and result.",
+    labelnames=("endpoint", "result"),
+)
+
+
+class ProductsBusyError(Exception):
+    """Too many products requests are in flight to take another one."""
+
+    def __init__(self, detail: str, in_flight: int) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.in_flight = in_flight
+
+
+class _Slot:
+    """One admitted request's place in flight. `release` is idempotent."""
+
+    __slots__ = ("_admission", "_released")
+
+    def __init__(self, admission: "_Admission") -> None:
+        self._admission = admission
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._admission._release()
+
+
+class _Admission:
+    """
+    Admits at most `limit` requests at once. Requests over the limit are
+    turned away, not queued, so the ones admitted keep a predictable latency.
+    """
+
+    __slots__ = ("limit", "in_flight")
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+
+    def acquire(self) -> _Slot:
+        if self.in_flight >= self.limit:
+            _rejected.inc()
+            raise ProductsBusyError("Too many product requests in flight", self.in_flight)
+
+        self.in_flight += 1
+        _in_flight.inc()
+        return _Slot(self)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        _in_flight.dec()
+
+
+_admission = _Admission(app_config.PRODUCTS.MAX_IN_FLIGHT)
+
+
+def _describe(error: Exception | None) -> str:
+    # Upstream errors carry the request URL, API key included, so only the kind is reported.
+    if error is None:
+        return "Product not found"
+
+    if isinstance(error, RetryError) and (last := error.last_attempt.exception()) is not None:
+        error = last
+
+    cause = error if isinstance(error, (HTTPStatusError, RequestError)) else error.__context__
+    if isinstance(cause, HTTPStatusError):
+        return f"Upstream returned {cause.response.status_code}"
+    if isinstance(cause, RequestError):
+        return "Upstream request failed"
+
+    return "Product lookup failed"
+
+
+class ProductService:
+    """
+    Product data without the agent: the search pipeline of `search_on_amazon`
+    and batch detail lookups.
+
+    Results are items of type "product" or "error", one per product, so a
+    batch returns whatever it could fetch and says what it could not. They
+    come in completion order and carry their `rank` in the request.
+    """
+
+    @staticmethod
+    def admit() -> _Slot:
+        """Takes an in-flight slot; raises `ProductsBusyError` when none is free."""
+        return _admission.acquire()
+
+    @staticmethod
+    async def search(request: ProductSearchRequest) -> list[SearchProduct]:
+        async with ScraperAPIService() as scraper_api:
+            return await scraper_api.find_products(
+                query=request.query,
+                region=request.region,
+                limit=request.top_n_products,
+                min_rating=request.min_rating,
+                min_price=request.min_price,
+                max_price=request.max_price,
+                prime_only=request.prime_only,
+                best_sellers_only=request.best_sellers_only,
+            )
+
+    @staticmethod
+    async def search_items(
+        request: ProductSearchRequest, products: list[SearchProduct]
+    ) -> AsyncIterator[dict[str, Any]]:
+        if not request.details:
+            for rank, product in enumerate(products):
+                yield {
+                    "type": "product",
+                    "rank": rank,
+                    "asin": product.asin,
+                    "product": product.model_dump(mode="json"),
+                }
+            return
+
+        async for item in ProductService._details(
+            {product.asin: str(product.url) for product in products}, region=request.region, endpoint="search"
+        ):
+            yield item
+
+    @staticmethod
+    def details_items(request: ProductDetailsRequest) -> AsyncIterator[dict[str, Any]]:
+        asins = dict.fromkeys(request.asins)
+        return ProductService._details(
+            {asin: product_url(asin, request.region) for asin in asins}, region=request.region, endpoint="details"
+        )
+
+    @staticmethod
+    async def _details(
+        asin_to_url: dict[str, str], *, region: str | None, endpoint: str
+    ) -> AsyncIterator[dict[str, Any]]:
+        rank = {asin: index for index, asin in enumerate(asin_to_url)}
+        async with ScraperAPIService() as scraper_api:
+            with track("details"):
+                async for asin, result in scraper_api.iter_details(
+                    asin_to_url, region=region, concurrency=app_config.PRODUCTS.CONCURRENCY
+                ):
+                    if isinstance(result, AmazonProductDetails):
+                        _lookups.labels(endpoint, "found").inc()
+                        yield {
+                            "type": "product",
+                            "rank": rank[asin],
+                            "asin": asin,
+                            "product": result.to_chatbot_view().model_dump(),
+                        }
+                    else:
+                        _lookups.labels(endpoint, "failed").inc()
+                        yield {"type": "error", "rank": rank[asin], "asin": asin, "error": _describe(result)}
+
+    @staticmethod
+    async def collect(items: AsyncIterator[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+        """All items, products and errors apart, in request order."""
+        collected: dict[str, list[dict[str, Any]]] = {"products": [], "errors": []}
+        async for item in items:
+            collected["products" if item.pop("type") == "product" else "errors"].append(item)
+
+        for group in collected.values():
+            group.sort(key=lambda item: item["rank"])
+
+        return collected
+
+    @staticmethod
+    async def stream_ndjson(
+        items: AsyncIterator[dict[str, Any]], timing: RequestTiming, slot: _Slot
+    ) -> AsyncGenerator[str, None]:
+        """
+        One JSON line per item as it completes, then a "done" line with the
+        counts and stage timings. The request's in-flight `slot` is released
+        when the stream ends, fails or is abandoned by the client; a stream
+        that never starts has to release it itself.
+        """
+        counts = {"product": 0, "error": 0}
+        try:
+            async for item in items:
+                counts[item["type"]] += 1
+                yield json.dumps(item) + "\n"
+
+            yield json.dumps(
+                {"type": "done", "products": counts["product"], "errors": counts["error"], "timing": timing.as_dict()}
+            ) + "\n"
+
+        finally:
+            slot.release()
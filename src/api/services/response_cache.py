@@ -0,0 +1,170 @@
+import json
+from collections.abc import Sequence
+from hashlib import sha256
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from ...agent.prompts import PROMPT_VERSION
+from ...core.cache import TieredCache
+from ...core.config import app_config
+from ...core.metrics import registry
+from ..core.models import Message
+from .history import ROLE_TYPES, is_visible
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+_skipped = registry.counter(
+    "product_pulse_response_cache_skipped_total",
+    "Finished agent turns not stored in the response cache, by reason.",
+    labelnames=("reason",),
+)
+
+
+class CachedResponse(BaseModel):
+    """One agent turn as it was stored: its messages after the user's, and the products it searched."""
+
+    messages: list[dict[str, Any]]
+    last_search: list[dict[str, Any]] | None = Field(default=None)
+
+    def to_messages(self) -> list["BaseMessage"]:
+        from langchain_core.messages import messages_from_dict
+
+        messages = messages_from_dict(self.messages)
+        for message in messages:
+            # Fresh ids, so the replayed messages never collide with the original thread's.
+            message.id = None
+        return messages
+
+    @property
+    def text(self) -> str:
+        """What a live stream of the turn would have shown: the text of every model message."""
+        from langchain_core.messages import messages_from_dict
+
+        return "".join(message.text for message in messages_from_dict(self.messages) if message.type == "ai")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def response_key(region: str | None, stored: Sequence["BaseMessage"], messages: Sequence[Message]) -> str:
+    """
+    Hashes what an answer depends on: the prompt and model, the region, and
+    the conversation as the user sees it, with whitespace and case folded.
+    """
+    conversation = [(message.type, _normalize(message.text)) for message in stored if is_visible(message)]
+    conversation += [(ROLE_TYPES.get(message.role, message.role), _normalize(message.content)) for message in messages]
+    payload = [
+        PROMPT_VERSION,
+        app_config.AGENT.MODEL,
+        (region or app_config.SCRAPER.COUNTRY_CODE).lower(),
+        conversation,
+    ]
+    return sha256(json.dumps(payload, separators=(",", ":")).encode()).hexdigest()
+
+
+def cacheable_turn(state: dict[str, Any]) -> CachedResponse | None:
+    """
+    The latest turn of a finished run, or None when it should not be
+    replayed: it failed somewhere, it did not end with an answer, or a
+    deadline cut its product data short.
+    """
+    messages = state.get("messages", [])
+    start = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].type == "human"), None)
+    turn = messages[start + 1 :] if start is not None else []
+    if (
+        not turn
+        or turn[-1].type != "ai"
+        or turn[-1].tool_calls
+        or not turn[-1].text
+        or any(message.type == "tool" and message.status == "error" for message in turn)
+    ):
+        _skipped.labels("not_cacheable").inc()
+        return None
+
+    if any(message.type == "tool" and (message.artifact or {}).get("missing") for message in turn):
+        _skipped.labels("partial").inc()
+        return None
+
+    from langchain_core.messages import messages_to_dict
+
+    searched = any(message.type == "tool" for message in turn)
+    return CachedResponse(
+        messages=messages_to_dict(turn),
+        last_search=state.get("last_search") if searched else None,
+    )
+
+
+class ResponseCache:
+    """
+    Final answers of agent turns, keyed by `response_key`.
+
+    Answers quote prices and stock from the product data they were built on,
+    so they never outlive it: there is no stale window, and `ttl` should not
+    exceed the product caches' TTLs. Memory holds at most `max_entries`
+    answers of at most `max_entry_bytes` each; larger turns are not cached.
+    """
+
+    __slots__ = ("_cache", "_max_entry_bytes")
+
+    def __init__(
+        self, *, max_entries: int, ttl: float, max_entry_bytes: int, sqlite_path: str | None = None
+    ) -> None:
+        self._cache: TieredCache[CachedResponse] = TieredCache(
+            name="responses",
+            model=CachedResponse,
+            max_entries=max_entries,
+            ttl=ttl,
+            sqlite_path=sqlite_path,
+        )
+        self._max_entry_bytes = max_entry_bytes
+
+    async def get(self, key: str) -> CachedResponse | None:
+        entry = await self._cache.get(key)
+        return entry.value if entry is not None else None
+
+    async def put(self, key: str, response: CachedResponse) -> None:
+        if len(response.model_dump_json()) > self._max_entry_bytes:
+            _skipped.labels("too_large").inc()
+            return
+
+        await self._cache.set(key, response)
+
+    def close(self) -> None:
+        self._cache.close()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return self._cache.stats()
+
+
+_response_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    global _response_cache
+    if _response_cache is None and app_config.AGENT.RESPONSE_CACHE:
+        _response_cache = ResponseCache(
+            max_entries=app_config.AGENT.RESPONSE_CACHE_MAX_ENTRIES,
+            ttl=app_config.AGENT.RESPONSE_CACHE_TTL
+            or min(app_config.CACHE.SEARCH_TTL, app_config.CACHE.DETAILS_TTL),
+            max_entry_bytes=app_config.AGENT.RESPONSE_CACHE_MAX_ENTRY_BYTES,
+            sqlite_path=app_config.CACHE.SQLITE_PATH,
+        )
+
+    return _response_cache
+
+
+def close_response_cache() -> None:
+    global _response_cache
+    if _response_cache is not None:
+        logger.info(f"Closing response cache: {_response_cache.stats()}")
+        _response_cache.close()
+
+    _response_cache = None
+
+
+def response_cache_stats() -> dict[str, dict[str, int]]:
+    return _response_cache.stats() if _response_cache is not None else {}
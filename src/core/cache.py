@@ -0,0 +1,290 @@
+import asyncio
+import contextvars
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from time import time
+from typing import Generic, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@dataclass(slots=True)
+class CacheEntry(Generic[M]):
+    value: M
+    fresh_until: float
+    stale_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time() < self.fresh_until
+
+    @property
+    def is_expired(self) -> bool:
+        return time() >= self.stale_until
+
+
+class _TierStats:
+    __slots__ = ("hits", "stale_hits", "misses", "evictions")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, entry: CacheEntry | None) -> None:
+        if entry is None:
+            self.misses += 1
+        elif entry.is_fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class MemoryCache(Generic[M]):
+    __slots__ = ("_entries", "_max_entries", "stats")
+
+    def __init__(self, *, max_entries: int) -> None:
+        self._entries: OrderedDict[str, CacheEntry[M]] = OrderedDict()
+        self._max_entries = max_entries
+        self.stats = _TierStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> CacheEntry[M] | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry.is_expired:
+            del self._entries[key]
+            entry = None
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+
+        self.stats.record(entry)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry[M]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteCache(Generic[M]):
+    """Disk-backed tier that keeps serialized models across restarts."""
+
+    __slots__ = ("_conn", "_lock", "_model", "_namespace", "stats")
+
+    def __init__(self, *, path: str, namespace: str, model: type[M]) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._model = model
+        self._namespace = namespace
+        self.stats = _TierStats()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "fresh_until REAL NOT NULL, stale_until REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    def _get(self, key: str) -> CacheEntry[M] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fresh_until, stale_until FROM cache WHERE namespace = ? AND key = ?",
+                (self._namespace, key),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        entry = CacheEntry(
+            value=self._model.model_validate_json(row[0]),
+            fresh_until=row[1],
+            stale_until=row[2],
+        )
+        if entry.is_expired:
+            self._delete(key)
+            self.stats.evictions += 1
+            return None
+
+        return entry
+
+    def _set(self, key: str, entry: CacheEntry[M]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (
+                    self._namespace,
+                    key,
+                    entry.value.model_dump_json(),
+                    entry.fresh_until,
+                    entry.stale_until,
+                ),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self._namespace, key),
+            )
+
+    def _clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self._namespace,))
+
+    async def get(self, key: str) -> CacheEntry[M] | None:
+        try:
+            entry = await asyncio.to_thread(self._get, key)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Disk cache read failed for '{key}': {e}")
+            entry = None
+
+        self.stats.record(entry)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry[M]) -> None:
+        try:
+            await asyncio.to_thread(self._set, key, entry)
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed for '{key}': {e}")
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache(Generic[M]):
+    """
+    LRU+TTL memory cache with an optional SQLite second tier.
+
+    Entries past `ttl` are still served for `stale_ttl` more seconds while a
+    background refresh replaces them (stale-while-revalidate). The refresh
+    runs in an empty context, not bound by the deadline or billed to the
+    timing of the request that happened to trigger it.
+    """
+
+    __slots__ = ("_name", "_memory", "_disk", "_ttl", "_stale_ttl", "_refreshing")
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        model: type[M],
+        max_entries: int,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        sqlite_path: str | None = None,
+    ) -> None:
+        self._name = name
+        self._memory: MemoryCache[M] = MemoryCache(max_entries=max_entries)
+        self._disk: SQLiteCache[M] | None = (
+            SQLiteCache(path=sqlite_path, namespace=name, model=model)
+            if sqlite_path
+            else None
+        )
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    def _entry(self, value: M) -> CacheEntry[M]:
+        now = time()
+        return CacheEntry(
+            value=value,
+            fresh_until=now + self._ttl,
+            stale_until=now + self._ttl + self._stale_ttl,
+        )
+
+    async def get(self, key: str) -> CacheEntry[M] | None:
+        entry = self._memory.get(key)
+        if entry is None and self._disk is not None:
+            entry = await self._disk.get(key)
+            if entry is not None:
+                self._memory.set(key, entry)
+
+        return entry
+
+    async def set(self, key: str, value: M) -> None:
+        entry = self._entry(value)
+        self._memory.set(key, entry)
+        if self._disk is not None:
+            await self._disk.set(key, entry)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[M]]) -> M:
+        entry = await self.get(key)
+        if entry is None:
+            value = await fetch()
+            await self.set(key, value)
+            return value
+
+        if not entry.is_fresh and key not in self._refreshing:
+            task = asyncio.create_task(self._refresh(key, fetch), context=contextvars.Context())
+            self._refreshing[key] = task
+
+        return entry.value
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[M]]) -> None:
+        try:
+            await self.set(key, await fetch())
+
+        except Exception as e:
+            logger.warning(f"Background refresh of {self._name} cache key '{key}' failed: {e}")
+
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def invalidate(self, key: str) -> None:
+        self._memory.delete(key)
+        if self._disk is not None:
+            await self._disk.delete(key)
+
+    async def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            await self._disk.clear()
+
+    def close(self) -> None:
+        for task in self._refreshing.values():
+            task.cancel()
+
+        if self._disk is not None:
+            self._disk.close()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        stats = {"memory": {**self._memory.stats.as_dict(), "size": len(self._memory)}}
+        if self._disk is not None:
+            stats["disk"] = self._disk.stats.as_dict()
+
+        return stats
@@ -1,27 +1,135 @@
 from typing import ClassVar, Literal
 
+from dotenv import load_dotenv
 from pydantic import BaseModel, Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Read .env once into the environment: the settings below and the SDKs
+# (OpenAI, LangSmith) all pick their values up from there.
+load_dotenv()
+
 
 class ScraperAPIConfig(BaseSettings):
     model_config: ClassVar[SettingsConfigDict] = SettingsConfigDict(
-        env_file=".env",
         extra="ignore",
-        env_file_encoding="utf-8",
         env_prefix="SCRAPERAPI_",
     )
 
     KEY: SecretStr
     OUTPUT_FORMAT: Literal["markdown"] | None = Field(default="markdown")
+    DECODE_MODE: Literal["fast", "strict"] = Field(default="fast")
     COUNTRY_CODE: str = Field(default="br")
+    BASE_URL: str = Field(default="https://api.scraperapi.com/structured/amazon")
+    TIMEOUT: float = Field(default=30.0)
+    MAX_CONNECTIONS: int = Field(default=50)
+    MAX_KEEPALIVE_CONNECTIONS: int = Field(default=10)
+    KEEPALIVE_EXPIRY: float = Field(default=60.0)
+    WARMUP: bool = Field(default=False)
+    INITIAL_CONCURRENCY: int = Field(default=3)
+    MIN_CONCURRENCY: int = Field(default=1)
+    MAX_CONCURRENCY: int = Field(default=10)
+    BACKOFF_FACTOR: float = Field(default=0.5)
+    REQUESTS_PER_SECOND: float | None = Field(default=None)
+    BURST: int = Field(default=5)
+    SHARED_STATE_PATH: str | None = Field(default=None)
+    SHARED_MAX_CONCURRENCY: int = Field(default=10)
+    MAX_CREDITS_PER_MINUTE: int | None = Field(default=None)
+    SEARCH_CREDIT_COST: int = Field(default=5)
+    DETAILS_CREDIT_COST: int = Field(default=5)
+    SEARCH_PAGE_BUDGET: int = Field(default=3)
+    HEDGE: bool = Field(default=True)
+    HEDGE_PERCENTILE: float = Field(default=0.95)
+    HEDGE_MIN_DELAY: float = Field(default=0.2)
+    HEDGE_MAX_DELAY: float = Field(default=5.0)
+    RETRY_BUDGET_RATIO: float = Field(default=0.1)
+    RETRY_BUDGET_MIN_PER_SECOND: float = Field(default=0.5)
+    RETRY_BUDGET_MAX_TOKENS: float = Field(default=20.0)
+
+
+class AgentConfig(BaseSettings):
+    model_config: ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        env_prefix="AGENT_",
+    )
+
+    MODEL: str = Field(default="gpt-5.2")
+    BUILD: Literal["startup", "background", "lazy"] = Field(default="startup")
+    WARMUP: bool = Field(default=False)
+    THREAD_POLICY: Literal["queue", "reject", "cancel"] = Field(default="queue")
+    THREAD_QUEUE_SIZE: int = Field(default=4)
+    TOOL_RESULT_TOKEN_BUDGET: int = Field(default=1200)
+    SEARCH_MAX_QUERIES: int = Field(default=4)
+    # Seconds a chat turn may take when the request does not set its own deadline.
+    DEADLINE: float = Field(default=60.0)
+    # Longest deadline a request may ask for.
+    DEADLINE_MAX: float = Field(default=300.0)
+    # Seconds of the deadline kept back from tools for the model to answer with what they found.
+    DEADLINE_RESERVE: float = Field(default=10.0)
+    STREAM_PIPELINE: Literal["messages", "events"] = Field(default="messages")
+    STREAM_FLUSH_CHARS: int = Field(default=48)
+    STREAM_FLUSH_INTERVAL: float = Field(default=0.05)
+    RESPONSE_CACHE: bool = Field(default=False)
+    # Defaults to the shorter of the search and product details TTLs.
+    RESPONSE_CACHE_TTL: float | None = Field(default=None)
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=512)
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = Field(default=64 * 1024)
+
+
+class ProductsConfig(BaseSettings):
+    model_config: ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        env_prefix="PRODUCTS_",
+    )
+
+    MAX_BATCH: int = Field(default=50)
+    MAX_RESULTS: int = Field(default=20)
+    CONCURRENCY: int = Field(default=8)
+    MAX_IN_FLIGHT: int = Field(default=64)
+
+
+class CacheConfig(BaseSettings):
+    model_config: ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        env_prefix="CACHE_",
+    )
+
+    ENABLED: bool = Field(default=True)
+    MAX_ENTRIES: int = Field(default=1024)
+    SEARCH_TTL: float = Field(default=15 * 60)
+    DETAILS_TTL: float = Field(default=60 * 60)
+    STALE_TTL: float = Field(default=5 * 60)
+    SQLITE_PATH: str | None = Field(default=None)
+
+
+class IndexConfig(BaseSettings):
+    model_config: ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        env_prefix="INDEX_",
+    )
+
+    ENABLED: bool = Field(default=True)
+    MAX_PRODUCTS: int = Field(default=500_000)
+    TTL: float = Field(default=15 * 60)
+
+
+class CheckpointerConfig(BaseSettings):
+    model_config: ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        env_prefix="CHECKPOINTER_",
+    )
+
+    MAX_THREADS: int = Field(default=1000)
+    MAX_BYTES: int = Field(default=256 * 1024 * 1024)
+    IDLE_TTL: float = Field(default=60 * 60)
+    KEEP_LAST: int = Field(default=2)
+    SQLITE_PATH: str | None = Field(default=None)
+    SQLITE_TTL: float = Field(default=7 * 24 * 60 * 60)
+    COMPACT_INTERVAL: float = Field(default=5 * 60)
 
 
 class ServerConfig(BaseSettings):
     model_config: ClassVar[SettingsConfigDict] = SettingsConfigDict(
-        env_file=".env",
         extra="ignore",
-        env_file_encoding="utf-8",
         env_prefix="SERVER_",
     )
 
@@ -30,11 +138,17 @@ class ServerConfig(BaseSettings):
     VERSION: str = Field(default="1.0.0")
     FRONTEND_URL: str = Field(default="http://")
     TOKEN: SecretStr
+    ROTATION_TOKENS: SecretStr | None = Field(default=None)
 
 
 class AppConfig(BaseModel):
     SCRAPER: ScraperAPIConfig = Field(default_factory=ScraperAPIConfig)
     SERVER: ServerConfig = Field(default_factory=ServerConfig)
+    AGENT: AgentConfig = Field(default_factory=AgentConfig)
+    PRODUCTS: ProductsConfig = Field(default_factory=ProductsConfig)
+    CACHE: CacheConfig = Field(default_factory=CacheConfig)
+    CHECKPOINTER: CheckpointerConfig = Field(default_factory=CheckpointerConfig)
+    INDEX: IndexConfig = Field(default_factory=IndexConfig)
 
 
 app_config = AppConfig()
@@ -0,0 +1,51 @@
+from contextvars import ContextVar
+from time import monotonic
+
+
+class Deadline:
+    """A point on the monotonic clock by which a request's work has to be done."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float) -> None:
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(monotonic() + seconds)
+
+    def earlier(self, seconds: float) -> "Deadline":
+        return Deadline(self.expires_at - seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return monotonic() >= self.expires_at
+
+
+class DeadlineExceeded(Exception):
+    """Work given up on because the request's deadline passed first."""
+
+
+_current: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+
+def set_deadline(deadline: Deadline | None) -> None:
+    """
+    Bounds the work of the current request. Like its timing, the deadline
+    is seen by the tasks the request spawns afterwards (LangGraph nodes,
+    tools, upstream fan-out).
+    """
+    _current.set(deadline)
+
+
+def current_deadline() -> Deadline | None:
+    return _current.get()
+
+
+def time_left() -> float | None:
+    """Seconds until the current request's deadline, or None when it has none."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
@@ -0,0 +1,114 @@
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from time import monotonic
+from typing import Generic, TypeVar
+
+from .retry_budget import RetryBudget
+
+R = TypeVar("R")
+
+
+class Hedger(Generic[R]):
+    """
+    Races a second attempt against a first one that is slower than usual.
+
+    When the first attempt has not answered after the `percentile` of recent
+    latencies (clamped to `min_delay`..`max_delay`, and `max_delay` until
+    `min_samples` calls have been seen), a hedge is started if `budget`
+    allows it. Whichever attempt succeeds first wins and the other is
+    cancelled; if one fails, the other is still awaited.
+    """
+
+    __slots__ = (
+        "_name",
+        "_percentile",
+        "_min_delay",
+        "_max_delay",
+        "_min_samples",
+        "_budget",
+        "_latencies",
+        "_delay",
+        "calls",
+        "hedged",
+        "won",
+        "denied",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        budget: RetryBudget,
+        percentile: float = 0.95,
+        min_delay: float = 0.05,
+        max_delay: float = 5.0,
+        window: int = 256,
+        min_samples: int = 20,
+    ) -> None:
+        self._name = name
+        self._percentile = percentile
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._min_samples = min_samples
+        self._budget = budget
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._delay: float | None = None
+        self.calls = 0
+        self.hedged = 0
+        self.won = 0
+        self.denied = 0
+
+    def delay(self) -> float:
+        if len(self._latencies) < self._min_samples:
+            return self._max_delay
+
+        if self._delay is None:
+            ordered = sorted(self._latencies)
+            value = ordered[min(len(ordered) - 1, int(self._percentile * len(ordered)))]
+            self._delay = min(self._max_delay, max(self._min_delay, value))
+
+        return self._delay
+
+    def _observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+        self._delay = None
+
+    async def do(self, attempt: Callable[[], Awaitable[R]]) -> R:
+        self.calls += 1
+        started_at = monotonic()
+        primary = asyncio.ensure_future(attempt())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay())
+            if not done:
+                if self._budget.withdraw("hedge"):
+                    self.hedged += 1
+                    tasks.append(asyncio.ensure_future(attempt()))
+                else:
+                    self.denied += 1
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in tasks if task in done and task.exception() is None), None)
+                if winner is not None:
+                    self._observe(monotonic() - started_at)
+                    self.won += winner is not primary
+                    return winner.result()
+
+            # Every attempt failed: report the first one's error.
+            return primary.result()
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "won": self.won,
+            "denied": self.denied,
+            "delay": self.delay(),
+        }
@@ -43,6 +43,13 @@ class AmazonProductDetails(BaseModel):
     customers_say: CustomersSay | None = Field(default=None)
     url: str | None = Field(default=None)
 
+    @classmethod
+    def from_json(cls, raw: bytes | str, *, url: str | None = None) -> "AmazonProductDetails":
+        """Validates the raw payload in one pass; fields we don't model are never materialized."""
+        details = cls.model_validate_json(raw)
+        details.url = url
+        return details
+
     def to_chatbot_view(
         self,
     ) -> ChatbotProductView:
@@ -1,3 +1,4 @@
+import json
 from typing import Any
 
 from loguru import logger
@@ -47,17 +48,57 @@ class SearchProduct(BaseModel):
 
     @field_validator("stars")
     @classmethod
-    def validate_stars(cls, v: float) -> float:
-        if not 0 <= v <= 5:
+    def validate_stars(cls, v: float | None) -> float | None:
+        if v is not None and not 0 <= v <= 5:
             raise ValueError("Stars must be between 0 and 5")
         return v
 
 
+class _LeanSearchProduct(SearchProduct):
+    # Plain strings instead of URL types, and defaults so that entries without
+    # an ASIN or a URL (sponsored blocks, banners) decode and can be dropped afterwards.
+    type: str = Field(default="")
+    position: int = Field(default=0)
+    asin: str | None = Field(default=None)
+    name: str = Field(default="")
+    image: str | None = Field(default=None)
+    has_prime: bool = Field(default=False)
+    is_best_seller: bool = Field(default=False)
+    is_amazon_choice: bool = Field(default=False)
+    is_limited_deal: bool = Field(default=False)
+    url: str | None = Field(default=None)
+
+
 class AmazonSearchResult(BaseModel):
     results: list[SearchProduct] = Field(default_factory=list)
     explore_more_items: list[dict[str, Any]] = Field(default_factory=list)
     next_pages: list[HttpUrl] = Field(default_factory=list)
 
+    @classmethod
+    def from_json(cls, raw: bytes | str, *, strict: bool = False) -> "AmazonSearchResult":
+        """
+        Decodes a ScraperAPI search payload, dropping results without an ASIN or a URL.
+
+        The default path validates the raw bytes in one pass, never materializes
+        `explore_more_items` and skips URL validation. `strict=True` validates
+        the full payload against these models instead.
+        """
+        if strict:
+            data = json.loads(raw)
+            data["results"] = [item for item in data["results"] if item.get("asin") and item.get("url")]
+            return cls(**data)
+
+        page = _LeanSearchPage.model_validate_json(raw)
+        return _LeanSearchResult.model_construct(
+            results=[product for product in page.results if product.asin and product.url],
+            next_pages=page.next_pages,
+        )
+
+    @classmethod
+    def decoded_type(cls, *, strict: bool = False) -> type["AmazonSearchResult"]:
+        """The class `from_json` returns, and so the one to read its results back from a serialized cache."""
+        return cls if strict else _LeanSearchResult
+
     @property
     def total_results(self) -> int:
         return len(self.results)
@@ -105,3 +146,13 @@ class AmazonSearchResult(BaseModel):
             n = self.total_results
 
         return self.results[:n]
+
+
+class _LeanSearchPage(BaseModel):
+    results: list[_LeanSearchProduct] = Field(default_factory=list)
+    next_pages: list[str] = Field(default_factory=list)
+
+
+class _LeanSearchResult(AmazonSearchResult):
+    results: list[_LeanSearchProduct] = Field(default_factory=list)
+    next_pages: list[str] = Field(default_factory=list)
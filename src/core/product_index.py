@@ -0,0 +1,415 @@
+import heapq
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from collections.abc import Iterable
+from time import monotonic, perf_counter
+
+from loguru import logger
+
+from .models.amazon_search_result import SearchProduct
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> frozenset[str]:
+    return frozenset(_TOKEN.findall(text.casefold()))
+
+
+class _SortedIndex:
+    """
+    `(key, asin)` pairs kept sorted in bounded buckets, for range queries with bisect.
+
+    Splitting the list keeps inserts and removals cheap at hundreds of
+    thousands of entries, where a single list would memmove on every change.
+    """
+
+    __slots__ = ("_buckets", "_maxes", "_len")
+
+    _LOAD = 512
+
+    def __init__(self) -> None:
+        self._buckets: list[list[tuple[float, str]]] = []
+        self._maxes: list[float] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: float, asin: str) -> None:
+        self._len += 1
+        if not self._buckets:
+            self._buckets.append([(key, asin)])
+            self._maxes.append(key)
+            return
+
+        index = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[index]
+        insort(bucket, (key, asin))
+        self._maxes[index] = bucket[-1][0]
+        if len(bucket) > 2 * self._LOAD:
+            self._buckets.insert(index + 1, bucket[self._LOAD :])
+            del bucket[self._LOAD :]
+            self._maxes.insert(index, bucket[-1][0])
+
+    def remove(self, key: float, asin: str) -> None:
+        item = (key, asin)
+        for index in range(bisect_left(self._maxes, key), len(self._buckets)):
+            bucket = self._buckets[index]
+            position = bisect_left(bucket, item)
+            if position < len(bucket) and bucket[position] == item:
+                del bucket[position]
+                self._len -= 1
+                if bucket:
+                    self._maxes[index] = bucket[-1][0]
+                else:
+                    del self._buckets[index]
+                    del self._maxes[index]
+                return
+
+            if bucket[0][0] > key:
+                return
+
+    def _ranges(self, low: float, high: float):
+        for index in range(bisect_left(self._maxes, low), len(self._buckets)):
+            bucket = self._buckets[index]
+            if bucket[0][0] > high:
+                return
+            start = bisect_left(bucket, (low,)) if bucket[0][0] < low else 0
+            stop = bisect_right(bucket, (high, "\uffff")) if bucket[-1][0] > high else len(bucket)
+            yield bucket, start, stop
+
+    def count(self, low: float, high: float) -> int:
+        return sum(stop - start for _, start, stop in self._ranges(low, high))
+
+    def between(self, low: float, high: float) -> list[str]:
+        return [asin for bucket, start, stop in self._ranges(low, high) for _, asin in bucket[start:stop]]
+
+
+class _QueryResults:
+    """ASINs per result page of one upstream query, and how many pages upstream has for it."""
+
+    __slots__ = ("fetched_at", "pages", "total_pages")
+
+    def __init__(self, fetched_at: float, total_pages: int) -> None:
+        self.fetched_at = fetched_at
+        self.pages: dict[int, list[str]] = {}
+        self.total_pages = total_pages
+
+    @property
+    def asins(self) -> list[str]:
+        """Every ASIN fetched, in search rank."""
+        return list(dict.fromkeys(asin for page in sorted(self.pages) for asin in self.pages[page]))
+
+
+class _RegionIndex:
+    __slots__ = ("products", "seen_at", "rank", "postings", "prices", "stars", "queries", "queries_by_token")
+
+    def __init__(self) -> None:
+        self.products: dict[str, SearchProduct] = {}
+        # Insertion order doubles as the eviction order (least recently seen first).
+        self.seen_at: OrderedDict[str, float] = OrderedDict()
+        # (page, position) of the product in the last results it came in.
+        self.rank: dict[str, tuple[int, int]] = {}
+        self.postings: dict[str, set[str]] = {}
+        self.prices = _SortedIndex()
+        self.stars = _SortedIndex()
+        # Query tokens -> their result pages, oldest fetch first.
+        self.queries: dict[frozenset[str], _QueryResults] = {}
+        self.queries_by_token: dict[str, set[frozenset[str]]] = {}
+
+    def insert(self, product: SearchProduct, rank: tuple[int, int], now: float) -> None:
+        asin = product.asin
+        if asin in self.products:
+            self.remove(asin)
+
+        self.products[asin] = product
+        self.seen_at[asin] = now
+        self.rank[asin] = rank
+        for token in tokenize(product.name):
+            self.postings.setdefault(token, set()).add(asin)
+        if product.price is not None:
+            self.prices.add(product.price, asin)
+        if product.stars is not None:
+            self.stars.add(product.stars, asin)
+
+    def remove(self, asin: str) -> None:
+        product = self.products.pop(asin)
+        del self.seen_at[asin]
+        del self.rank[asin]
+        for token in tokenize(product.name):
+            if (posting := self.postings.get(token)) is not None:
+                posting.discard(asin)
+                if not posting:
+                    del self.postings[token]
+        if product.price is not None:
+            self.prices.remove(product.price, asin)
+        if product.stars is not None:
+            self.stars.remove(product.stars, asin)
+
+    def record_query(self, tokens: frozenset[str], results: _QueryResults) -> None:
+        self.queries.pop(tokens, None)
+        self.queries[tokens] = results
+        for token in tokens:
+            self.queries_by_token.setdefault(token, set()).add(tokens)
+
+    def forget_query(self, tokens: frozenset[str]) -> None:
+        del self.queries[tokens]
+        for token in tokens:
+            if (queries := self.queries_by_token.get(token)) is not None:
+                queries.discard(tokens)
+                if not queries:
+                    del self.queries_by_token[token]
+
+
+class ProductIndex:
+    """
+    Per-region catalog of every product returned by upstream searches.
+
+    Names are kept in an inverted index and prices/stars in sorted indexes, so
+    a query plus filters resolves with set intersections and bisects instead
+    of a scan. A query is answered locally only when coverage is fresh: the
+    same query, or one whose words it contains, was fetched upstream within
+    `ttl` seconds, and enough fresh products match to fill the request.
+    Otherwise `search` returns None and the caller goes upstream.
+    """
+
+    def __init__(self, *, max_products: int = 500_000, ttl: float = 900.0) -> None:
+        self.max_products = max_products
+        self.ttl = ttl
+        self._regions: dict[str, _RegionIndex] = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lookup_time = 0.0
+
+    def add(
+        self,
+        region: str,
+        query: str,
+        products: Iterable[SearchProduct],
+        *,
+        page: int = 1,
+        total_pages: int = 1,
+    ) -> None:
+        """
+        Indexes one result page of `query`; page 1 also says how many pages
+        upstream has for it (`total_pages`).
+
+        Later pages extend a fresh page 1 of the query, filed by page number
+        so they keep search rank in whatever order they arrive. Without one
+        (page 1 came from the search cache, or expired) their products are
+        still indexed, but not recorded as the query's results.
+        """
+        now = monotonic()
+        index = self._regions.setdefault(region, _RegionIndex())
+        tokens = tokenize(query)
+
+        results: _QueryResults | None = None
+        earlier: set[str] = set()
+        if page == 1:
+            results = _QueryResults(now, total_pages)
+        elif (previous := index.queries.get(tokens)) is not None and previous.fetched_at >= now - self.ttl:
+            results = previous
+            earlier = {asin for number, asins in previous.pages.items() if number < page for asin in asins}
+
+        asins = []
+        for position, product in enumerate(products):
+            if not product.asin or product.asin in earlier:
+                continue
+            self._size -= product.asin in index.products
+            index.insert(product, (page, position), now)
+            self._size += 1
+            asins.append(product.asin)
+
+        if tokens and results is not None:
+            results.pages[page] = asins
+            if page == 1:
+                index.record_query(tokens, results)
+
+        self._evict()
+
+    def get(self, region: str, asin: str) -> SearchProduct | None:
+        """The indexed search result for `asin`, however old."""
+        index = self._regions.get(region)
+        return index.products.get(asin) if index is not None else None
+
+    def search(
+        self,
+        region: str,
+        query: str,
+        *,
+        limit: int,
+        min_rating: float | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        prime_only: bool = False,
+        best_sellers_only: bool = False,
+        max_pages: int = 1,
+    ) -> list[SearchProduct] | None:
+        """
+        Up to `limit` indexed products for `query`, or None when the caller
+        should search upstream. `max_pages` is how many result pages the
+        caller would fetch upstream to fill the request.
+        """
+        started_at = perf_counter()
+        try:
+            products = self._search(
+                region,
+                tokenize(query),
+                limit=limit,
+                max_pages=max_pages,
+                min_rating=min_rating,
+                min_price=min_price,
+                max_price=max_price,
+                prime_only=prime_only,
+                best_sellers_only=best_sellers_only,
+            )
+        finally:
+            self._lookup_time += perf_counter() - started_at
+
+        if products is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            logger.info(f"Answered '{query}' ({region}) from the product index: {len(products)} products")
+
+        return products
+
+    def _search(
+        self,
+        region: str,
+        tokens: frozenset[str],
+        *,
+        limit: int,
+        max_pages: int,
+        min_rating: float | None,
+        min_price: float | None,
+        max_price: float | None,
+        prime_only: bool,
+        best_sellers_only: bool,
+    ) -> list[SearchProduct] | None:
+        index = self._regions.get(region)
+        if index is None or not tokens:
+            return None
+
+        fresh_after = monotonic() - self.ttl
+        exact = index.queries.get(tokens)
+        repeat = exact is not None and exact.fetched_at >= fresh_after
+        if repeat:
+            # A repeat query keeps upstream ranking, and its own result list is exactly
+            # what upstream would return again, so it is answered even if short...
+            candidates: Iterable[str] = exact.asins
+
+        elif self._is_covered(index, tokens, fresh_after):
+            postings = sorted((index.postings.get(token, set()) for token in tokens), key=len)
+            candidates = set.intersection(*postings)
+            # Narrow with the sorted indexes when a range is more selective than the name match.
+            if min_price is not None or max_price is not None:
+                low = min_price if min_price is not None else float("-inf")
+                high = max_price if max_price is not None else float("inf")
+                if index.prices.count(low, high) < len(candidates):
+                    candidates = candidates.intersection(index.prices.between(low, high))
+            if min_rating is not None:
+                if index.stars.count(min_rating, float("inf")) < len(candidates):
+                    candidates = candidates.intersection(index.stars.between(min_rating, float("inf")))
+
+        else:
+            return None
+
+        products = index.products
+        seen_at = index.seen_at
+        matches = [
+            asin
+            for asin in candidates
+            if asin in products
+            and seen_at[asin] >= fresh_after
+            and self._matches(
+                products[asin],
+                min_rating=min_rating,
+                min_price=min_price,
+                max_price=max_price,
+                prime_only=prime_only,
+                best_sellers_only=best_sellers_only,
+            )
+        ]
+        if repeat:
+            # ...unless upstream has more pages, within the caller's budget, that were never fetched.
+            if len(matches) < limit and len(exact.pages) < min(exact.total_pages, max_pages):
+                return None
+            return [products[asin] for asin in matches[:limit]]
+
+        if len(matches) < limit:
+            return None
+
+        matches = heapq.nsmallest(
+            limit, matches, key=lambda asin: (index.rank[asin], -(products[asin].stars or 0))
+        )
+        return [products[asin] for asin in matches]
+
+    @staticmethod
+    def _is_covered(index: _RegionIndex, tokens: frozenset[str], fresh_after: float) -> bool:
+        for token in tokens:
+            for covering in index.queries_by_token.get(token, ()):
+                if covering <= tokens and index.queries[covering].fetched_at >= fresh_after:
+                    return True
+
+        return False
+
+    @staticmethod
+    def _matches(
+        product: SearchProduct,
+        *,
+        min_rating: float | None,
+        min_price: float | None,
+        max_price: float | None,
+        prime_only: bool,
+        best_sellers_only: bool,
+    ) -> bool:
+        if prime_only and not product.has_prime:
+            return False
+        if best_sellers_only and not product.is_best_seller:
+            return False
+        if min_rating is not None and not (product.stars and product.stars >= min_rating):
+            return False
+        if min_price is not None or max_price is not None:
+            low = min_price if min_price is not None else 0
+            high = max_price if max_price is not None else float("inf")
+            if not (product.price and low <= product.price <= high):
+                return False
+
+        return True
+
+    def _evict(self) -> None:
+        while self._size > self.max_products:
+            index = max(self._regions.values(), key=lambda index: len(index.products))
+            asin = next(iter(index.seen_at))
+            index.remove(asin)
+            self._size -= 1
+            self._evictions += 1
+
+        expired_before = monotonic() - self.ttl
+        for index in self._regions.values():
+            while index.queries:
+                tokens, results = next(iter(index.queries.items()))
+                if results.fetched_at >= expired_before:
+                    break
+                index.forget_query(tokens)
+
+    def clear(self) -> None:
+        self._regions.clear()
+        self._size = 0
+
+    def stats(self) -> dict[str, int | float | dict[str, int]]:
+        lookups = self._hits + self._misses
+        return {
+            "products": self._size,
+            "regions": {region: len(index.products) for region, index in self._regions.items()},
+            "queries": sum(len(index.queries) for index in self._regions.values()),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "avg_lookup_us": self._lookup_time / lookups * 1e6 if lookups else 0.0,
+        }
@@ -0,0 +1,180 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from time import monotonic
+
+from loguru import logger
+
+from .metrics import registry
+
+_wait_seconds = registry.histogram(
+    "product_pulse_limiter_wait_seconds",
+    "Time spent waiting for an upstream concurrency slot.",
+    labelnames=("limiter",),
+)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter with an optional token bucket in front of it.
+
+    The concurrency limit grows by one after a full window of successful calls
+    and is multiplied by `backoff_factor` when upstream answers with 429. A
+    `Retry-After` hint blocks every new call until it has elapsed.
+    """
+
+    __slots__ = (
+        "_name",
+        "_limit",
+        "_min_limit",
+        "_max_limit",
+        "_backoff_factor",
+        "_rate",
+        "_burst",
+        "_tokens",
+        "_refilled_at",
+        "_blocked_until",
+        "_last_decrease",
+        "_in_flight",
+        "_waiting",
+        "_cond",
+        "_wait_seconds",
+        "successes",
+        "rate_limited",
+    )
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        initial_limit: int,
+        min_limit: int = 1,
+        max_limit: int = 10,
+        backoff_factor: float = 0.5,
+        requests_per_second: float | None = None,
+        burst: int = 1,
+    ) -> None:
+        self._name = name
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._backoff_factor = backoff_factor
+        self._rate = requests_per_second
+        self._burst = max(burst, 1)
+        self._tokens = float(self._burst)
+        self._refilled_at = monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._cond = asyncio.Condition()
+        self._wait_seconds = _wait_seconds.labels(name)
+        self.successes = 0
+        self.rate_limited = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _take_token(self, now: float) -> float:
+        if not self._rate:
+            return 0.0
+
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._refilled_at) * self._rate
+        )
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+
+        return (1 - self._tokens) / self._rate
+
+    async def acquire(self) -> None:
+        started_at = monotonic()
+        async with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = monotonic()
+                    wait = self._blocked_until - now
+                    if wait <= 0 and self._in_flight < self.limit:
+                        wait = self._take_token(now)
+                        if wait <= 0:
+                            break
+
+                    try:
+                        await asyncio.wait_for(
+                            self._cond.wait(), timeout=wait if wait > 0 else None
+                        )
+                    except TimeoutError:
+                        pass
+
+                self._in_flight += 1
+            finally:
+                self._waiting -= 1
+                self._wait_seconds.observe(monotonic() - started_at)
+
+    async def release(self) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    def on_success(self) -> None:
+        self.successes += 1
+        self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        self.rate_limited += 1
+        now = monotonic()
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+        # A burst of 429s from calls that were already in flight counts as one signal.
+        if now - self._last_decrease < 1.0:
+            return
+
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(self._min_limit, self._limit * self._backoff_factor)
+        logger.warning(
+            f"{self._name} limiter backing off: concurrency {previous} -> {self.limit}"
+            + (f", paused for {retry_after:.1f}s" if retry_after else "")
+        )
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "blocked_for": max(0.0, self._blocked_until - monotonic()),
+            "successes": self.successes,
+            "rate_limited": self.rate_limited,
+        }
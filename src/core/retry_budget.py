@@ -0,0 +1,48 @@
+from time import monotonic
+
+
+class RetryBudget:
+    """
+    Token bucket that caps retries and hedges at a share of upstream traffic.
+
+    Every request sent upstream deposits `ratio` tokens, and every retry or
+    hedge has to withdraw a whole one. `min_per_second` tokens also accrue
+    with time, so a quiet process can still retry. During an upstream
+    incident the extra attempts therefore stay near `ratio` of the load
+    instead of multiplying it. The bucket holds at most `max_tokens`.
+    """
+
+    __slots__ = ("_ratio", "_min_per_second", "_max_tokens", "_tokens", "_refilled_at", "withdrawn", "denied")
+
+    def __init__(self, *, ratio: float = 0.1, min_per_second: float = 0.5, max_tokens: float = 20.0) -> None:
+        self._ratio = ratio
+        self._min_per_second = min_per_second
+        self._max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._refilled_at = monotonic()
+        self.withdrawn: dict[str, int] = {}
+        self.denied: dict[str, int] = {}
+
+    def _refill(self, amount: float = 0.0) -> None:
+        now = monotonic()
+        amount += (now - self._refilled_at) * self._min_per_second
+        self._tokens = min(self._max_tokens, self._tokens + amount)
+        self._refilled_at = now
+
+    def deposit(self) -> None:
+        self._refill(self._ratio)
+
+    def withdraw(self, kind: str) -> bool:
+        """Spends a token on a `kind` of extra attempt ("retry", "hedge"); False when the budget is exhausted."""
+        self._refill()
+        if self._tokens < 1.0:
+            self.denied[kind] = self.denied.get(kind, 0) + 1
+            return False
+
+        self._tokens -= 1.0
+        self.withdrawn[kind] = self.withdrawn.get(kind, 0) + 1
+        return True
+
+    def stats(self) -> dict[str, float | dict[str, int]]:
+        self._refill()
+        return {"tokens": self._tokens, "withdrawn": dict(self.withdrawn), "denied": dict(self.denied)}
@@ -0,0 +1,218 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from time import monotonic, time
+from uuid import uuid4
+
+from loguru import logger
+
+from .metrics import registry
+
+# Same family as the per-process limiter, under limiter="shared".
+_wait_seconds = registry.histogram(
+    "product_pulse_limiter_wait_seconds",
+    "Time spent waiting for an upstream concurrency slot.",
+    labelnames=("limiter",),
+).labels("shared")
+
+
+class SharedQuota:
+    """
+    Host-wide concurrency, backoff and credit accounting shared by every worker.
+
+    State lives in a SQLite file and every mutation runs inside `BEGIN
+    IMMEDIATE`, so the database file lock serializes workers. Leases held by
+    dead processes, or older than `lease_timeout`, are reclaimed automatically.
+    """
+
+    __slots__ = (
+        "_path",
+        "_max_concurrency",
+        "_max_credits_per_minute",
+        "_lease_timeout",
+        "_poll_interval",
+        "_conn",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        *,
+        path: str,
+        max_concurrency: int,
+        max_credits_per_minute: int | None = None,
+        lease_timeout: float = 120.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self._path = path
+        self._max_concurrency = max_concurrency
+        self._max_credits_per_minute = max_credits_per_minute
+        self._lease_timeout = lease_timeout
+        self._poll_interval = poll_interval
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "holder TEXT PRIMARY KEY, pid INTEGER NOT NULL, acquired_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS credits (minute INTEGER PRIMARY KEY, used INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value REAL NOT NULL)"
+            )
+
+    def _reap_leases(self, now: float) -> None:
+        for holder, pid in self._conn.execute("SELECT holder, pid FROM leases").fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                self._conn.execute("DELETE FROM leases WHERE holder = ?", (holder,))
+            except PermissionError:
+                pass
+
+        self._conn.execute(
+            "DELETE FROM leases WHERE acquired_at < ?", (now - self._lease_timeout,)
+        )
+
+    def _reserve(self, holder: str, credits: int, now: float) -> float:
+        row = self._conn.execute(
+            "SELECT value FROM state WHERE key = 'blocked_until'"
+        ).fetchone()
+        if row and row[0] > now:
+            return row[0] - now
+
+        self._reap_leases(now)
+        (in_flight,) = self._conn.execute("SELECT COUNT(*) FROM leases").fetchone()
+        if in_flight >= self._max_concurrency:
+            return self._poll_interval
+
+        minute = int(now // 60)
+        if self._max_credits_per_minute is not None:
+            row = self._conn.execute(
+                "SELECT used FROM credits WHERE minute = ?", (minute,)
+            ).fetchone()
+            if row and row[0] + credits > self._max_credits_per_minute:
+                return (minute + 1) * 60 - now
+
+        self._conn.execute(
+            "INSERT INTO leases VALUES (?, ?, ?)", (holder, os.getpid(), now)
+        )
+        self._conn.execute(
+            "INSERT INTO credits VALUES (?, ?) "
+            "ON CONFLICT(minute) DO UPDATE SET used = used + excluded.used",
+            (minute, credits),
+        )
+        self._conn.execute("DELETE FROM credits WHERE minute < ?", (minute - 60,))
+        return 0.0
+
+    def _try_acquire(self, holder: str, credits: int) -> float:
+        """Takes a lease and reserves credits, or returns how long to wait first."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                wait = self._reserve(holder, credits, time())
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            self._conn.execute("COMMIT")
+            return wait
+
+    def _release(self, holder: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE holder = ?", (holder,))
+
+    def _block_until(self, until: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO state VALUES ('blocked_until', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (until,),
+            )
+
+    async def acquire(self, credits: int = 1) -> str:
+        holder = uuid4().hex
+        started_at = monotonic()
+        try:
+            return await self._acquire(holder, credits)
+        finally:
+            _wait_seconds.observe(monotonic() - started_at)
+
+    async def _acquire(self, holder: str, credits: int) -> str:
+        while True:
+            attempt = asyncio.ensure_future(
+                asyncio.to_thread(self._try_acquire, holder, credits)
+            )
+            try:
+                wait = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                # The attempt may still take the lease after we stop waiting for it.
+                attempt.add_done_callback(
+                    lambda _: asyncio.ensure_future(self.release(holder))
+                )
+                raise
+            except sqlite3.Error as e:
+                logger.warning(f"Shared quota unavailable, proceeding without it: {e}")
+                return holder
+
+            if wait <= 0:
+                return holder
+
+            await asyncio.sleep(wait)
+
+    async def release(self, holder: str) -> None:
+        try:
+            await asyncio.to_thread(self._release, holder)
+        except sqlite3.Error as e:
+            # The lease is reclaimed once it outlives `lease_timeout`.
+            logger.warning(f"Failed to release shared quota lease: {e}")
+
+    @asynccontextmanager
+    async def slot(self, credits: int = 1) -> AsyncIterator[None]:
+        holder = await self.acquire(credits)
+        try:
+            yield
+        finally:
+            await self.release(holder)
+
+    async def on_rate_limited(self, retry_after: float | None, default_pause: float) -> None:
+        pause = retry_after if retry_after is not None else default_pause
+        try:
+            await asyncio.to_thread(self._block_until, time() + pause)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to share rate limit pause across workers: {e}")
+
+    def stats(self) -> dict[str, float | int | list[int]]:
+        now = time()
+        minute = int(now // 60)
+        with self._lock:
+            (in_flight,) = self._conn.execute("SELECT COUNT(*) FROM leases").fetchone()
+            used = dict(
+                self._conn.execute(
+                    "SELECT minute, used FROM credits WHERE minute > ?", (minute - 5,)
+                ).fetchall()
+            )
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = 'blocked_until'"
+            ).fetchone()
+
+        return {
+            "in_flight": in_flight,
+            "max_concurrency": self._max_concurrency,
+            "blocked_for": max(0.0, row[0] - now) if row else 0.0,
+            "credits_this_minute": used.get(minute, 0),
+            "credits_per_minute": [used.get(m, 0) for m in range(minute - 4, minute + 1)],
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
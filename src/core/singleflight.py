@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+from .deadline import DeadlineExceeded, time_left
+
+R = TypeVar("R")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[R]):
+    """
+    Coalesces concurrent calls for the same key into one in-flight task.
+
+    Every caller awaits the shared task through `asyncio.shield`, so a single
+    caller being cancelled does not cancel the work for the others. The task
+    itself is only cancelled once every caller waiting on it has gone away.
+
+    The task runs in an empty context rather than a copy of the first
+    caller's: it serves every caller, so it must not carry that caller's
+    deadline or request timing. Each caller bounds its own wait instead,
+    giving up with `DeadlineExceeded` when its deadline passes.
+    """
+
+    __slots__ = ("_name", "_flights", "calls", "deduplicated")
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._flights: dict[str, _Flight] = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[R]]) -> R:
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.create_task(fn(), name=f"{self._name}:{key}", context=contextvars.Context())
+            flight = _Flight(task)
+            flight.task.add_done_callback(lambda task: self._finish(key, task))
+            self._flights[key] = flight
+        else:
+            self.deduplicated += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), time_left())
+
+        except TimeoutError:
+            if flight.task.done():
+                raise
+
+            self._leave(key, flight)
+            raise DeadlineExceeded(f"{self._name} '{key}' did not finish before the deadline") from None
+
+        except asyncio.CancelledError:
+            self._leave(key, flight)
+            raise
+
+        finally:
+            flight.waiters -= 1
+
+    def _leave(self, key: str, flight: _Flight) -> None:
+        """Cancels the flight when the caller giving up on it was the last one waiting."""
+        if flight.waiters == 1 and not flight.task.done():
+            flight.task.cancel()
+            # Callers arriving before `_finish` runs start a new flight instead of joining this one.
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        flight = self._flights.get(key)
+        if flight is not None and flight.task is task:
+            del self._flights[key]
+
+        # Mark the exception as retrieved even if every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._flights),
+        }
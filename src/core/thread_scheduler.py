@@ -0,0 +1,171 @@
+import asyncio
+from collections import deque
+from typing import Literal
+
+SchedulerPolicy = Literal["queue", "reject", "cancel"]
+
+SUPERSEDED = "Superseded by a newer run on this thread"
+
+
+class ThreadBusyError(Exception):
+    """A run could not be scheduled on its thread."""
+
+    def __init__(self, detail: str, queue_depth: int) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.queue_depth = queue_depth
+
+
+class ThreadLease:
+    """
+    The right to run on a thread until `release` is called.
+
+    The task that acquired the lease owns it; superseding cancels the owner.
+    A stream that runs in another task is handed over with `detach` and
+    `adopt`, and checks `superseded` once it starts. `release` is idempotent.
+    """
+
+    __slots__ = ("_scheduler", "thread_id", "superseded", "_owner", "_released")
+
+    def __init__(self, scheduler: "ThreadScheduler", thread_id: str) -> None:
+        self._scheduler = scheduler
+        self.thread_id = thread_id
+        self.superseded = False
+        self._owner = asyncio.current_task()
+        self._released = False
+
+    def adopt(self) -> None:
+        self._owner = asyncio.current_task()
+
+    def detach(self) -> None:
+        self._owner = None
+
+    def release_if_detached(self) -> None:
+        """Releases a lease that was detached and never adopted, e.g. by a stream that never started."""
+        if self._owner is None:
+            self.release()
+
+    def absorb(self) -> bool:
+        """
+        Called on `CancelledError`: if this lease was superseded, clears the
+        cancellation so the run can report it, and returns True.
+        """
+        task = asyncio.current_task()
+        if not self.superseded or task is None or not task.cancelling():
+            return False
+
+        task.uncancel()
+        return True
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._scheduler._release(self)
+
+    def _supersede(self) -> None:
+        self.superseded = True
+        if self._owner is not None and not self._owner.done():
+            self._owner.cancel()
+
+
+class _Lane:
+    __slots__ = ("holder", "waiters")
+
+    def __init__(self, holder: ThreadLease) -> None:
+        self.holder = holder
+        self.waiters: deque[tuple[ThreadLease, asyncio.Future]] = deque()
+
+
+class ThreadScheduler:
+    """
+    Runs at most one agent run per thread at a time.
+
+    When a thread is busy, `policy` decides what happens to a new run:
+    "queue" waits in a FIFO of at most `max_queue` runs, "reject" fails at
+    once, and "cancel" supersedes the running and queued runs so the newest
+    one goes next. Threads nobody is running or waiting on hold no state.
+    """
+
+    __slots__ = ("_policy", "_max_queue", "_lanes", "runs", "queued", "rejected", "superseded")
+
+    def __init__(self, *, policy: SchedulerPolicy = "queue", max_queue: int = 4) -> None:
+        self._policy = policy
+        self._max_queue = max_queue
+        self._lanes: dict[str, _Lane] = {}
+        self.runs = 0
+        self.queued = 0
+        self.rejected = 0
+        self.superseded = 0
+
+    async def acquire(self, thread_id: str) -> ThreadLease:
+        """Returns a lease once the thread is free; raises `ThreadBusyError` per the policy."""
+        lease = ThreadLease(self, thread_id)
+        lane = self._lanes.get(thread_id)
+        if lane is None:
+            self._lanes[thread_id] = _Lane(lease)
+            self.runs += 1
+            return lease
+
+        if self._policy == "reject" or (self._policy == "queue" and len(lane.waiters) >= self._max_queue):
+            self.rejected += 1
+            raise ThreadBusyError("Another run is in progress on this thread", len(lane.waiters))
+
+        if self._policy == "cancel":
+            for waiting, granted in lane.waiters:
+                waiting.superseded = True
+                granted.set_exception(ThreadBusyError(SUPERSEDED, 0))
+            self.superseded += len(lane.waiters) + (not lane.holder.superseded)
+            lane.waiters.clear()
+            lane.holder._supersede()
+
+        granted = asyncio.get_running_loop().create_future()
+        lane.waiters.append((lease, granted))
+        self.queued += 1
+        try:
+            await granted
+        except asyncio.CancelledError:
+            if granted.done() and not granted.cancelled() and granted.exception() is None:
+                # Granted just as the caller went away: hand the thread on.
+                lease.release()
+            elif (lease, granted) in lane.waiters:
+                lane.waiters.remove((lease, granted))
+            raise
+
+        lease.adopt()
+        self.runs += 1
+        return lease
+
+    def _release(self, lease: ThreadLease) -> None:
+        lane = self._lanes.get(lease.thread_id)
+        if lane is None or lane.holder is not lease:
+            return
+
+        while lane.waiters:
+            waiting, granted = lane.waiters.popleft()
+            if not granted.done():
+                lane.holder = waiting
+                granted.set_result(None)
+                return
+
+        del self._lanes[lease.thread_id]
+
+    def is_busy(self, thread_id: str) -> bool:
+        """Whether a run holds the thread or is waiting for it."""
+        return thread_id in self._lanes
+
+    def queue_depth(self, thread_id: str | None = None) -> int:
+        if thread_id is not None:
+            lane = self._lanes.get(thread_id)
+            return len(lane.waiters) if lane is not None else 0
+
+        return sum(len(lane.waiters) for lane in self._lanes.values())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "active_threads": len(self._lanes),
+            "queue_depth": self.queue_depth(),
+            "runs": self.runs,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "superseded": self.superseded,
+        }
@@ -0,0 +1,90 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any
+
+
+class RequestTiming:
+    """
+    Time spent per stage while serving one request.
+
+    Stages may overlap (the model call that triggers a tool includes it, and
+    concurrent detail fetches each add their own time), so the stage sums
+    are an attribution and are not expected to add up to `total`.
+    """
+
+    __slots__ = ("started_at", "_stages")
+
+    def __init__(self) -> None:
+        self.started_at = perf_counter()
+        self._stages: dict[str, list[float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        entry = self._stages.get(stage)
+        if entry is None:
+            self._stages[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    @property
+    def total(self) -> float:
+        return perf_counter() - self.started_at
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "stages": {
+                stage: {"ms": round(seconds * 1000, 1), "count": int(count)}
+                for stage, (seconds, count) in self._stages.items()
+            },
+        }
+
+    def server_timing(self) -> str:
+        metrics = [
+            f'{stage};dur={seconds * 1000:.1f};desc="{int(count)}x"'
+            for stage, (seconds, count) in self._stages.items()
+        ]
+        metrics.append(f"total;dur={self.total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def start_request_timing() -> RequestTiming:
+    """
+    Starts timing the current request.
+
+    The timing object is shared, not copied, by the tasks the request spawns
+    afterwards (LangGraph nodes, tools, upstream fan-out), so their stages
+    all land on it.
+    """
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def use_request_timing(timing: RequestTiming) -> None:
+    """Makes `timing` the current request's again, e.g. in a stream body that runs after its endpoint returned."""
+    _current.set(timing)
+
+
+def current_timing() -> RequestTiming | None:
+    return _current.get()
+
+
+@contextmanager
+def track(stage: str) -> Iterator[None]:
+    """Attributes the time spent in the block to `stage`; a no-op outside a timed request."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    started_at = perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(stage, perf_counter() - started_at)
@@ -7,9 +7,22 @@ from typing import overload, ParamSpec, TypeVar, Callable
 
 from loguru import logger
 
+from .core.metrics import registry
+
 R = TypeVar("R")
 P = ParamSpec("P")
 
+_function_duration = registry.histogram(
+    "product_pulse_function_duration_seconds",
+    "Duration of functions decorated with with_timer.",
+    labelnames=("function",),
+)
+_function_errors = registry.counter(
+    "product_pulse_function_errors_total",
+    "Exceptions raised by functions decorated with with_timer.",
+    labelnames=("function",),
+)
+
 
 @overload
 def with_timer(func: Callable[P, R]) -> Callable[P, R]: ...
@@ -18,6 +31,9 @@ def with_timer(func: Callable[P, R]) -> Callable[P, R]: ...
 def with_timer(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]: ...
 
 def with_timer(func: Callable[P, R] | Callable[P, Awaitable[R]]) -> Callable[P, R] | Callable[P, Awaitable[R]]:
+    duration = _function_duration.labels(func.__qualname__)
+    errors = _function_errors.labels(func.__qualname__)
+
     if inspect.iscoroutinefunction(func):
         @wraps(func)
         async def _wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
@@ -25,8 +41,12 @@ def with_timer(func: Callable[P, R] | Callable[P, Awaitable[R]]) -> Callable[P,
                 start_time = perf_counter()
                 result = await func(*args, **kwargs)
                 return result
+            except Exception:
+                errors.inc()
+                raise
             finally:
                 end_time = perf_counter()
+                duration.observe(end_time - start_time)
                 logger.info(f"Function {func.__name__} took {end_time - start_time:.4f} seconds to run")
         return _wrapper
 
@@ -36,8 +56,12 @@ def with_timer(func: Callable[P, R] | Callable[P, Awaitable[R]]) -> Callable[P,
             start_time = perf_counter()
             result = func(*args, **kwargs)
             return result
+        except Exception:
+            errors.inc()
+            raise
         finally:
             end_time = perf_counter()
+            duration.observe(end_time - start_time)
             logger.info(f"Function {func.__name__} took {end_time - start_time:.4f} seconds to run")
     return _wrapper
 
@@ -1,19 +1,223 @@
-from dotenv import load_dotenv
-from fastapi import FastAPI, status, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from loguru import logger
+from starlette.background import BackgroundTask
 
-from .api.core.models import ChatRequest, ChatResponse
+from .agent import aget_agent, checkpointer, warm_up_agent
+from .api.core.models import ChatRequest, ChatResponse, ProductDetailsRequest, ProductSearchRequest
+from .api.core.responses import ReleasingStreamingResponse
 from .api.middleware.bearer_auth_middleware import BearerAuthMiddleware
-from .api.services.agent_service import AgentService
+from .api.services.agent_service import AgentService, thread_scheduler
+from .api.services.history import HistoryConflictError
+from .api.services.product_service import NDJSON, ProductsBusyError, ProductService
+from .api.services.response_cache import close_response_cache, response_cache_stats
 from .core.config import app_config
+from .core.deadline import Deadline
+from .core.metrics import registry
+from .core.thread_scheduler import SUPERSEDED, ThreadBusyError
+from .core.timing import start_request_timing, track
+from .services.scraperapi_service import (
+    cache_stats,
+    close_caches,
+    close_http_client,
+    close_shared_quota,
+    get_http_client,
+    hedge_stats,
+    http_client_stats,
+    index_stats,
+    limiter_stats,
+    retry_budget_stats,
+    singleflight_stats,
+)
+
+
+async def _compact_checkpoints() -> None:
+    while True:
+        await asyncio.sleep(app_config.CHECKPOINTER.COMPACT_INTERVAL)
+        await checkpointer.acompact()
+        logger.info(f"Checkpointer stats: {checkpointer.stats()}")
+
+
+def _register_metrics() -> None:
+    # Components already keep these numbers; they are only read when /metrics is scraped.
+    registry.callback(
+        "product_pulse_limiter_limit", "Current adaptive concurrency limit.", lambda: limiter_stats()["limit"]
+    )
+    registry.callback(
+        "product_pulse_limiter_in_flight", "Upstream calls holding a slot.", lambda: limiter_stats()["in_flight"]
+    )
+    registry.callback(
+        "product_pulse_limiter_queue_depth",
+        "Upstream calls waiting for a slot.",
+        lambda: limiter_stats()["waiting"],
+    )
+    registry.callback(
+        "product_pulse_upstream_rate_limited_total",
+        "429 responses seen by the limiter.",
+        lambda: limiter_stats()["rate_limited"],
+        type="counter",
+    )
+    registry.callback(
+        "product_pulse_http_connections",
+        "Pooled ScraperAPI connections, by state.",
+        lambda: {
+            ("total",): http_client_stats().get("connections", 0),
+            ("idle",): http_client_stats().get("idle_connections", 0),
+        },
+        labelnames=("state",),
+    )
+    registry.callback(
+        "product_pulse_singleflight_deduplicated_total",
+        "Calls that joined an in-flight request instead of starting one.",
+        lambda: {(name,): stats["deduplicated"] for name, stats in singleflight_stats().items()},
+        labelnames=("flight",),
+        type="counter",
+    )
+    registry.callback(
+        "product_pulse_hedge_requests_total",
+        "Hedged upstream calls: all calls, hedges sent, hedges that answered first, and hedges the budget denied.",
+        lambda: {
+            (name, outcome): stats[outcome]
+            for name, stats in hedge_stats().items()
+            for outcome in ("calls", "hedged", "won", "denied")
+        },
+        labelnames=("operation", "outcome"),
+        type="counter",
+    )
+    registry.callback(
+        "product_pulse_hedge_delay_seconds",
+        "How long a call waits before it is hedged.",
+        lambda: {(name,): stats["delay"] for name, stats in hedge_stats().items()},
+        labelnames=("operation",),
+    )
+    registry.callback(
+        "product_pulse_retry_budget_tokens",
+        "Retries and hedges the process-wide budget can still pay for.",
+        lambda: retry_budget_stats()["tokens"],
+    )
+    registry.callback(
+        "product_pulse_retry_budget_requests_total",
+        "Retries and hedges by whether the budget allowed them.",
+        lambda: {
+            (kind, result): count
+            for result in ("withdrawn", "denied")
+            for kind, count in retry_budget_stats()[result].items()
+        },
+        labelnames=("kind", "result"),
+        type="counter",
+    )
+    registry.callback(
+        "product_pulse_cache_lookups_total",
+        "Cache lookups by cache, tier and result.",
+        lambda: {
+            (name, tier, result): tier_stats[result]
+            for name, stats in {**cache_stats(), "responses": response_cache_stats()}.items()
+            for tier, tier_stats in stats.items()
+            for result in ("hits", "stale_hits", "misses")
+        },
+        labelnames=("cache", "tier", "result"),
+        type="counter",
+    )
+    registry.callback(
+        "product_pulse_response_cache_entries",
+        "Agent answers held in memory by the response cache.",
+        lambda: response_cache_stats().get("memory", {}).get("size", 0),
+    )
+    registry.callback(
+        "product_pulse_product_index_products",
+        "Products held in the local product index.",
+        lambda: index_stats().get("products", 0),
+    )
+    registry.callback(
+        "product_pulse_product_index_lookups_total",
+        "Product index lookups by result.",
+        lambda: {(result,): index_stats().get(result, 0) for result in ("hits", "misses")},
+        labelnames=("result",),
+        type="counter",
+    )
+    registry.callback(
+        "product_pulse_thread_queue_depth",
+        "Agent runs waiting for their thread to be free.",
+        lambda: thread_scheduler.stats()["queue_depth"],
+    )
+    registry.callback(
+        "product_pulse_thread_active",
+        "Threads with an agent run in progress.",
+        lambda: thread_scheduler.stats()["active_threads"],
+    )
+    registry.callback(
+        "product_pulse_thread_runs_total",
+        "Agent runs by how the thread scheduler handled them.",
+        lambda: {
+            (outcome,): thread_scheduler.stats()[outcome] for outcome in ("runs", "queued", "rejected", "superseded")
+        },
+        labelnames=("outcome",),
+        type="counter",
+    )
+    registry.callback(
+        "product_pulse_checkpointer_threads",
+        "Conversation threads held in memory by the checkpointer.",
+        lambda: checkpointer.stats()["threads"],
+    )
+    registry.callback(
+        "product_pulse_checkpointer_bytes",
+        "Approximate size of the checkpoints held in memory.",
+        lambda: checkpointer.stats()["bytes"],
+    )
+    registry.callback(
+        "product_pulse_checkpointer_evictions_total",
+        "Threads evicted from memory by the checkpointer.",
+        lambda: checkpointer.evictions,
+        type="counter",
+    )
+
+
+_register_metrics()
+
+
+async def _prepare_agent() -> None:
+    if app_config.AGENT.WARMUP:
+        await warm_up_agent()
+    else:
+        await aget_agent()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    http_client = get_http_client()
+    if app_config.SCRAPER.WARMUP:
+        await http_client.warmup()
+
+    # "lazy" leaves the build to the first request.
+    agent_build = None
+    if app_config.AGENT.BUILD == "startup":
+        await _prepare_agent()
+    elif app_config.AGENT.BUILD == "background":
+        agent_build = asyncio.create_task(_prepare_agent())
+
+    compaction = asyncio.create_task(_compact_checkpoints())
+
+    yield
+
+    compaction.cancel()
+    if agent_build is not None:
+        agent_build.cancel()
+    await close_http_client()
+    close_caches()
+    close_response_cache()
+    close_shared_quota()
+    checkpointer.close()
 
-load_dotenv()
 
 app = FastAPI(
     title=app_config.SERVER.TITLE,
     description=app_config.SERVER.DESCRIPTION,
     version=app_config.SERVER.VERSION,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -25,29 +229,113 @@ app.add_middleware(
 )
 
 app.add_middleware(
-    BearerAuthMiddleware, excluded_paths=["/docs", "/redoc", "/openapi.json", "/ping"]
+    BearerAuthMiddleware,
+    excluded_paths=["/docs", "/redoc", "/openapi.json", "/ping", "/metrics"],
 )
 
 
+def _history_conflict(error: HistoryConflictError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": error.detail, "last_message_id": error.last_message_id},
+    )
+
+
+def _thread_busy(error: ThreadBusyError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": error.detail, "queue_depth": error.queue_depth},
+    )
+
+
+def _products_busy(error: ProductsBusyError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": error.detail, "in_flight": error.in_flight},
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _products_response(request: Request, items, timing, slot) -> JSONResponse | ReleasingStreamingResponse:
+    """Streams NDJSON when the client accepts it, otherwise answers with all items at once."""
+    if NDJSON in request.headers.get("accept", ""):
+        return ReleasingStreamingResponse(
+            ProductService.stream_ndjson(items, timing, slot),
+            media_type=NDJSON,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # Covers a stream that never starts because the client went away first.
+            background=BackgroundTask(slot.release),
+        )
+
+    try:
+        content = await ProductService.collect(items)
+    finally:
+        slot.release()
+
+    response = JSONResponse(status_code=status.HTTP_200_OK, content=content)
+    response.headers["Server-Timing"] = timing.server_timing()
+    return response
+
+
 @app.post("/api/v1/agent/stream")
 async def stream_agent(request: ChatRequest):
     """
     Streaming endpoint using Server-Sent Events (SSE).
-    
+
+    Clients can send only the new messages together with `last_message_id`,
+    the `message_id` of the previous `final_state`. A history that does not
+    continue the stored thread is answered with 409 and the thread's latest
+    message id. Runs on one thread never overlap; when the thread is busy the
+    `AGENT_THREAD_POLICY` decides between waiting, 429, or superseding the
+    running stream. With `AGENT_RESPONSE_CACHE` on, a turn answered before
+    is replayed as a stream and its `final_state` has `cached: true`. The
+    request's `deadline` (or `AGENT_DEADLINE`) starts counting on arrival;
+    products whose details are still unfinished near it are answered from
+    their search data alone.
+
     Example usage with curl:
     curl -N -X POST http://localhost:8000/api/v1/agent/stream \
          -H "Content-Type: application/json" \
          -d '{"messages": [{"role": "user", "content": "Hello!"}]}'
     """
-    request.stream_mode = ["messages", "state"]
-    return StreamingResponse(
-        AgentService.stream_agent(request=request),
+    timing = start_request_timing()
+    deadline = Deadline.after(request.deadline or app_config.AGENT.DEADLINE)
+    try:
+        lease = await AgentService.acquire_thread(request)
+    except ThreadBusyError as e:
+        return _thread_busy(e)
+
+    try:
+        request = await AgentService.resolve_history(request)
+        cache_key, cached = await AgentService.lookup_response(request)
+    except HistoryConflictError as e:
+        lease.release()
+        return _history_conflict(e)
+    except asyncio.CancelledError:
+        lease.release()
+        if not lease.absorb():
+            raise
+        return _thread_busy(ThreadBusyError(SUPERSEDED, 0))
+    except Exception:
+        lease.release()
+        raise
+
+    request.stream_mode = ["messages", "custom"]
+    lease.detach()
+    return ReleasingStreamingResponse(
+        AgentService.stream_agent(
+            request=request, lease=lease, cache_key=cache_key, cached=cached, deadline=deadline, timing=timing
+        ),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
+            # Only what happened before the stream; the SSE `timing` event has the full breakdown.
+            "Server-Timing": timing.server_timing(),
         },
+        # Covers a stream that never starts because the client went away first.
+        background=BackgroundTask(lease.release_if_detached),
     )
 
 @app.post("/api/v1/agent/run")
@@ -60,15 +348,108 @@ async def run_agent(request: ChatRequest):
          -H "Content-Type: application/json" \
          -d '{"messages": [{"role": "user", "content": "Hello!"}]}'
     """
+    timing = start_request_timing()
+    deadline = Deadline.after(request.deadline or app_config.AGENT.DEADLINE)
     try:
-        state = await AgentService.run_agent(request=request)
-        response = ChatResponse.build_from_state(state=state)
-        return JSONResponse(status_code=status.HTTP_200_OK, content=response.model_dump())
+        lease = await AgentService.acquire_thread(request)
+    except ThreadBusyError as e:
+        return _thread_busy(e)
+
+    try:
+        request = await AgentService.resolve_history(request)
+        cache_key, cached = await AgentService.lookup_response(request)
+        if cached is not None:
+            state = await AgentService.replay_response(request, cached)
+        else:
+            state = await AgentService.run_agent(request=request, cache_key=cache_key, deadline=deadline)
+
+        with track("serialize"):
+            response = ChatResponse.build_from_state(
+                state=state, thread_id=request.thread_id, cached=cached is not None
+            )
+            json_response = JSONResponse(status_code=status.HTTP_200_OK, content=response.model_dump())
+
+        json_response.headers["Server-Timing"] = timing.server_timing()
+        return json_response
+
+    except HistoryConflictError as e:
+        return _history_conflict(e)
+
+    except asyncio.CancelledError:
+        if not lease.absorb():
+            raise
+        return _thread_busy(ThreadBusyError(SUPERSEDED, 0))
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+    finally:
+        lease.release()
     
 
+@app.post("/api/v1/products/search")
+async def search_products(body: ProductSearchRequest, request: Request):
+    """
+    Runs the agent's product search without the LLM: filtered search results,
+    with their product details unless `details` is false.
+
+    Detail lookups that fail are reported as "error" items next to the
+    products that were found. With `Accept: application/x-ndjson` items are
+    streamed one per line as they complete, followed by a "done" line.
+
+    Example usage with curl:
+    curl -N -X POST http://localhost:8000/api/v1/products/search \
+         -H "Content-Type: application/json" -H "Accept: application/x-ndjson" \
+         -d '{"query": "gaming mouse", "top_n_products": 5, "min_rating": 4.5}'
+    """
+    timing = start_request_timing()
+    try:
+        slot = ProductService.admit()
+    except ProductsBusyError as e:
+        return _products_busy(e)
+
+    try:
+        products = await ProductService.search(body)
+    except Exception as e:
+        slot.release()
+        logger.error(f"Product search failed for '{body.query}': {e}")
+        return JSONResponse(status_code=status.HTTP_502_BAD_GATEWAY, content={"detail": "Product search failed"})
+    except BaseException:
+        slot.release()
+        raise
+
+    return await _products_response(request, ProductService.search_items(body, products), timing, slot)
+
+
+@app.post("/api/v1/products/details")
+async def get_products_details(body: ProductDetailsRequest, request: Request):
+    """
+    Looks up the details of up to `PRODUCTS_MAX_BATCH` ASINs at once.
+
+    Each ASIN comes back as a "product" or an "error" item, so one failed
+    lookup does not fail the batch. With `Accept: application/x-ndjson`
+    items are streamed one per line as they complete.
+
+    Example usage with curl:
+    curl -X POST http://localhost:8000/api/v1/products/details \
+         -H "Content-Type: application/json" \
+         -d '{"asins": ["B0BQJ9PL8V", "B09NJDN2FG"], "region": "us"}'
+    """
+    timing = start_request_timing()
+    try:
+        slot = ProductService.admit()
+    except ProductsBusyError as e:
+        return _products_busy(e)
+
+    return await _products_response(request, ProductService.details_items(body), timing, slot)
+
+
 @app.get("/ping")
 def ping():
     return JSONResponse(status_code=status.HTTP_200_OK, content={"message": "pong"})
+
+
+@app.get("/metrics")
+async def metrics():
+    # Rendered on the event loop: the callbacks read state the loop mutates, so they must not run in a worker thread.
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,8 +1,12 @@
 import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 
-from httpx import AsyncClient, HTTPStatusError, Limits, RequestError
+from httpx import URL, AsyncClient, HTTPStatusError, InvalidURL, Limits, Request, RequestError, Response
 from loguru import logger
 from tenacity import (
+    RetryCallState,
     before_sleep_log,
     retry,
     retry_if_exception_type,
@@ -10,15 +14,49 @@ from tenacity import (
     wait_exponential,
 )
 
+from ..core.cache import TieredCache
 from ..core.config import app_config
+from ..core.deadline import DeadlineExceeded, time_left
+from ..core.hedging import Hedger
+from ..core.metrics import registry
+from ..core.product_index import ProductIndex
+from ..core.rate_limiter import AdaptiveLimiter, parse_retry_after
+from ..core.retry_budget import RetryBudget
+from ..core.shared_quota import SharedQuota
+from ..core.singleflight import SingleFlight
+from ..core.timing import track
 from ..core.models.amazon_product_details import AmazonProductDetails
 from ..core.models.amazon_search_result import AmazonSearchResult, SearchProduct
-from ..decorators import with_semaphore, with_timer
+from ..decorators import with_timer
 
-_semaphore = asyncio.Semaphore(3)
+_limiter = AdaptiveLimiter(
+    name="scraperapi",
+    initial_limit=app_config.SCRAPER.INITIAL_CONCURRENCY,
+    min_limit=app_config.SCRAPER.MIN_CONCURRENCY,
+    max_limit=app_config.SCRAPER.MAX_CONCURRENCY,
+    backoff_factor=app_config.SCRAPER.BACKOFF_FACTOR,
+    requests_per_second=app_config.SCRAPER.REQUESTS_PER_SECOND,
+    burst=app_config.SCRAPER.BURST,
+)
+
+# Shared by every retry and hedge in the process.
+_retry_budget = RetryBudget(
+    ratio=app_config.SCRAPER.RETRY_BUDGET_RATIO,
+    min_per_second=app_config.SCRAPER.RETRY_BUDGET_MIN_PER_SECOND,
+    max_tokens=app_config.SCRAPER.RETRY_BUDGET_MAX_TOKENS,
+)
 
 class _HttpxClient:
-    __slots__ = ("_base_url", "_timeout", "_client", "_limits")
+    __slots__ = (
+        "_base_url",
+        "_timeout",
+        "_client",
+        "_limits",
+        "_requests_total",
+        "_acquisitions",
+        "_in_flight",
+        "_peak_in_flight",
+    )
 
     def __init__(
         self,
@@ -27,14 +65,20 @@ class _HttpxClient:
         timeout: float = 30.0,
         max_connections: int = 100,
         max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 5.0,
     ) -> None:
         self._base_url = base_url
         self._timeout = timeout
         self._client: AsyncClient | None = None
+        self._requests_total = 0
+        self._acquisitions = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
 
         self._limits = Limits(
             max_connections=max_connections,
             max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
         )
 
     def _get_client(self) -> AsyncClient:
@@ -44,15 +88,33 @@ class _HttpxClient:
                 timeout=self._timeout,
                 limits=self._limits,
                 http2=True,
+                event_hooks={"request": [self.count_request]},
             )
 
         return self._client
 
+    async def count_request(self, request: Request) -> None:
+        """Request event hook: counts every request sent, retries and redirects included."""
+        self._requests_total += 1
+
     async def __aenter__(self) -> AsyncClient:
+        self._acquisitions += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
         return self._get_client()
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb) -> AsyncClient:
-        await self.close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        # The client is long-lived and shared; it is only closed through close().
+        self._in_flight -= 1
+
+    async def warmup(self) -> None:
+        client = self._get_client()
+        try:
+            await client.head("/")
+            logger.info(f"Warmed up HTTP connection to {self._base_url}")
+
+        except RequestError as e:
+            logger.warning(f"Failed to warm up HTTP connection to {self._base_url}: {e}")
 
     async def close(self):
         if self._client is not None:
@@ -63,102 +125,820 @@ class _HttpxClient:
     def is_closed(self) -> bool:
         return self._client is None or self._client.is_closed
 
+    def _pool_counts(self) -> dict[str, int]:
+        """
+        Open and idle connections of the httpcore pool behind the client.
+
+        httpx has no public API for these, so they are read defensively: with
+        another transport (or httpx internals that moved) they are left out.
+        """
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if not isinstance(connections, list):
+            return {}
+
+        try:
+            idle = sum(1 for conn in list(connections) if conn.is_idle())
+        except Exception:
+            return {}
+
+        return {"connections": len(connections), "idle_connections": idle}
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "closed": self.is_closed,
+            "requests_total": self._requests_total,
+            "acquisitions": self._acquisitions,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            **self._pool_counts(),
+            "max_connections": self._limits.max_connections,
+            "max_keepalive_connections": self._limits.max_keepalive_connections,
+        }
+
+
+_http_client: _HttpxClient | None = None
+
+
+def get_http_client() -> _HttpxClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = _HttpxClient(
+            base_url=app_config.SCRAPER.BASE_URL,
+            timeout=app_config.SCRAPER.TIMEOUT,
+            max_connections=app_config.SCRAPER.MAX_CONNECTIONS,
+            max_keepalive_connections=app_config.SCRAPER.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=app_config.SCRAPER.KEEPALIVE_EXPIRY,
+        )
+
+    return _http_client
+
+
+def http_client_stats() -> dict[str, int | bool]:
+    return _http_client.stats() if _http_client is not None else {}
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        logger.info(f"Closing ScraperAPI HTTP client: {_http_client.stats()}")
+        await _http_client.close()
+        _http_client = None
+
+
+_search_flight: SingleFlight[AmazonSearchResult] = SingleFlight("search")
+_details_flight: SingleFlight[AmazonProductDetails] = SingleFlight("product_details")
+_details_hedger: Hedger[AmazonProductDetails] = Hedger(
+    "product_details",
+    budget=_retry_budget,
+    percentile=app_config.SCRAPER.HEDGE_PERCENTILE,
+    min_delay=app_config.SCRAPER.HEDGE_MIN_DELAY,
+    max_delay=app_config.SCRAPER.HEDGE_MAX_DELAY,
+)
+
+_search_cache: TieredCache[AmazonSearchResult] | None = None
+_details_cache: TieredCache[AmazonProductDetails] | None = None
+
+
+def get_search_cache() -> TieredCache[AmazonSearchResult] | None:
+    global _search_cache
+    if _search_cache is None and app_config.CACHE.ENABLED:
+        _search_cache = TieredCache(
+            name="search",
+            model=AmazonSearchResult.decoded_type(strict=app_config.SCRAPER.DECODE_MODE == "strict"),
+            max_entries=app_config.CACHE.MAX_ENTRIES,
+            ttl=app_config.CACHE.SEARCH_TTL,
+            stale_ttl=app_config.CACHE.STALE_TTL,
+            sqlite_path=app_config.CACHE.SQLITE_PATH,
+        )
+
+    return _search_cache
+
+
+def get_details_cache() -> TieredCache[AmazonProductDetails] | None:
+    global _details_cache
+    if _details_cache is None and app_config.CACHE.ENABLED:
+        _details_cache = TieredCache(
+            name="product_details",
+            model=AmazonProductDetails,
+            max_entries=app_config.CACHE.MAX_ENTRIES,
+            ttl=app_config.CACHE.DETAILS_TTL,
+            stale_ttl=app_config.CACHE.STALE_TTL,
+            sqlite_path=app_config.CACHE.SQLITE_PATH,
+        )
+
+    return _details_cache
+
+
+def close_caches() -> None:
+    global _search_cache, _details_cache
+    for cache in (_search_cache, _details_cache):
+        if cache is not None:
+            logger.info(f"Closing cache: {cache.stats()}")
+            cache.close()
+
+    _search_cache = _details_cache = None
+
+
+def cache_stats() -> dict[str, dict]:
+    return {
+        name: cache.stats()
+        for name, cache in (("search", _search_cache), ("product_details", _details_cache))
+        if cache is not None
+    }
+
+
+_product_index: ProductIndex | None = None
+
+
+def get_product_index() -> ProductIndex | None:
+    global _product_index
+    if _product_index is None and app_config.INDEX.ENABLED:
+        _product_index = ProductIndex(
+            max_products=app_config.INDEX.MAX_PRODUCTS,
+            ttl=app_config.INDEX.TTL,
+        )
+
+    return _product_index
+
+
+def index_stats() -> dict:
+    return _product_index.stats() if _product_index is not None else {}
+
+
+_shared_quota: SharedQuota | None = None
+
+
+def get_shared_quota() -> SharedQuota | None:
+    global _shared_quota
+    if _shared_quota is None and app_config.SCRAPER.SHARED_STATE_PATH:
+        _shared_quota = SharedQuota(
+            path=app_config.SCRAPER.SHARED_STATE_PATH,
+            max_concurrency=app_config.SCRAPER.SHARED_MAX_CONCURRENCY,
+            max_credits_per_minute=app_config.SCRAPER.MAX_CREDITS_PER_MINUTE,
+            lease_timeout=app_config.SCRAPER.TIMEOUT * 2,
+        )
+
+    return _shared_quota
+
+
+def close_shared_quota() -> None:
+    global _shared_quota
+    if _shared_quota is not None:
+        _shared_quota.close()
+        _shared_quota = None
+
+
+@asynccontextmanager
+async def _upstream_slot(endpoint: str, credits: int) -> AsyncIterator[None]:
+    shared_quota = get_shared_quota()
+    holder = None
+    with track("upstream_wait"):
+        try:
+            await _limiter.acquire()
+            try:
+                if shared_quota is not None:
+                    holder = await shared_quota.acquire(credits)
+            except BaseException:
+                await _limiter.release()
+                raise
+        except asyncio.CancelledError:
+            # Never sent, so nothing was billed for it.
+            _upstream_cancelled.labels(endpoint, "queued").inc()
+            raise
+
+    try:
+        yield
+    finally:
+        try:
+            if holder is not None:
+                await shared_quota.release(holder)
+        finally:
+            await _limiter.release()
+
+
+def limiter_stats() -> dict[str, float | int]:
+    stats = _limiter.stats()
+    if _shared_quota is not None:
+        stats["shared"] = _shared_quota.stats()
+
+    return stats
+
+
+def hedge_stats() -> dict[str, dict[str, float | int]]:
+    return {"product_details": _details_hedger.stats()}
+
+
+def retry_budget_stats() -> dict[str, float | dict[str, int]]:
+    return _retry_budget.stats()
+
+
+def singleflight_stats() -> dict[str, dict[str, int]]:
+    return {
+        "search": _search_flight.stats(),
+        "product_details": _details_flight.stats(),
+    }
+
+
+def _resolve_region(region: str | None) -> str:
+    return (region or app_config.SCRAPER.COUNTRY_CODE).lower()
+
+
+def _search_key(query: str, region: str | None, page: int = 1) -> str:
+    key = f"{_resolve_region(region)}:{' '.join(query.lower().split())}"
+    return key if page == 1 else f"{key}#{page}"
+
+
+def _page_number(url: str, default: int) -> int:
+    try:
+        return int(URL(url).params.get("page", default))
+    except (InvalidURL, ValueError):
+        return default
+
+
+def _details_key(asin: str, region: str | None) -> str:
+    return f"{_resolve_region(region)}:{asin.upper()}"
+
+
+# Storefronts whose domain is not amazon.<country code>.
+_AMAZON_DOMAINS = {
+    "us": "amazon.com",
+    "br": "amazon.com.br",
+    "gb": "amazon.co.uk",
+    "uk": "amazon.co.uk",
+    "jp": "amazon.co.jp",
+    "mx": "amazon.com.mx",
+    "au": "amazon.com.au",
+}
+
+
+def product_url(asin: str, region: str | None = None) -> str:
+    """The URL search results gave for `asin`, or its product page on the region's storefront."""
+    region = _resolve_region(region)
+    if (index := get_product_index()) is not None and (product := index.get(region, asin)) is not None:
+        return str(product.url)
+
+    return f"https://www.{_AMAZON_DOMAINS.get(region, f'amazon.{region}')}/dp/{asin}"
+
+
+async def invalidate_search(query: str, region: str | None = None) -> None:
+    if (cache := get_search_cache()) is not None:
+        await cache.invalidate(_search_key(query, region))
+
+
+async def invalidate_product_details(asin: str, region: str | None = None) -> None:
+    if (cache := get_details_cache()) is not None:
+        await cache.invalidate(_details_key(asin, region))
+
+
+def fuse_rankings(rankings: Sequence[Sequence[SearchProduct]], *, limit: int, k: int = 60) -> list[SearchProduct]:
+    """
+    Merges ranked result lists by ASIN with reciprocal rank fusion.
+
+    A product scores 1 / (k + rank) in every list it appears in, so products
+    several queries agree on rise above a single query's top hit. Ties keep
+    the order of the lists, which interleaves their top results.
+    """
+    scores: dict[str, float] = {}
+    products: dict[str, SearchProduct] = {}
+    for ranking in rankings:
+        for rank, product in enumerate(ranking, start=1):
+            scores[product.asin] = scores.get(product.asin, 0.0) + 1.0 / (k + rank)
+            products.setdefault(product.asin, product)
+
+    return [products[asin] for asin in sorted(scores, key=scores.__getitem__, reverse=True)[:limit]]
+
+
+class _RateLimitError(Exception):
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+_RETRY_ATTEMPTS = 3
+_backoff = wait_exponential(multiplier=1, min=2, max=30)
+_log_retry = before_sleep_log(logger, "WARNING")
+
+_upstream_responses = registry.counter(
+    "product_pulse_upstream_responses_total",
+    "ScraperAPI responses by endpoint and HTTP status (\"error\" for transport failures).",
+    labelnames=("endpoint", "status"),
+)
+_upstream_cancelled = registry.counter(
+    "product_pulse_upstream_cancelled_total",
+    "ScraperAPI calls abandoned because their caller was cancelled, by endpoint and whether "
+    "they were still queued (never sent) or already in flight.",
+    labelnames=("endpoint", "stage"),
+)
+_upstream_retries = registry.counter(
+    "product_pulse_upstream_retries_total",
+    "ScraperAPI calls retried, by operation and reason.",
+    labelnames=("operation", "reason"),
+)
+_deadline_cuts = registry.counter(
+    "product_pulse_deadline_cuts_total",
+    "Upstream work given up on because of a request deadline: retries skipped, "
+    "and search queries or product details not waited for.",
+    labelnames=("kind",),
+)
+
+
+def _has_attempts_left(retry_state: RetryCallState) -> bool:
+    # Tenacity asks `retry` before `stop`. Checked first, the predicates below
+    # never spend a budget token or count a cut on the final attempt.
+    return retry_state.attempt_number < _RETRY_ATTEMPTS
 
-class _RateLimitError(Exception): ...
+
+def _within_deadline(retry_state: RetryCallState) -> bool:
+    """False when the retry's wait plus an attempt as long as the ones so far would outlast the deadline."""
+    if (left := time_left()) is None:
+        return True
+
+    attempt = (retry_state.outcome_timestamp - retry_state.start_time) / retry_state.attempt_number
+    if _wait_retry_after(retry_state) + attempt <= left:
+        return True
+
+    _deadline_cuts.labels("retry").inc()
+    return False
+
+
+def _within_retry_budget(retry_state: RetryCallState) -> bool:
+    return _retry_budget.withdraw("retry")
+
+
+def _before_retry(retry_state: RetryCallState) -> None:
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    reason = "rate_limited" if isinstance(exc, _RateLimitError) else "request_error"
+    _upstream_retries.labels(retry_state.fn.__name__ if retry_state.fn else "unknown", reason).inc()
+    _log_retry(retry_state)
+
+
+async def _upstream_get(
+    client: AsyncClient, endpoint: str, params: dict[str, str | int]
+) -> Response:
+    _retry_budget.deposit()
+    try:
+        with track(f"scraperapi_{endpoint}"):
+            response = await client.get(f"/{endpoint}/v1", params=params)
+    except RequestError:
+        _upstream_responses.labels(endpoint, "error").inc()
+        raise
+    except asyncio.CancelledError:
+        _upstream_cancelled.labels(endpoint, "in_flight").inc()
+        raise
+
+    _upstream_responses.labels(endpoint, str(response.status_code)).inc()
+    return response
+
+
+def _wait_retry_after(retry_state: RetryCallState) -> float:
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    retry_after = getattr(exc, "retry_after", None)
+    return retry_after if retry_after is not None else _backoff(retry_state)
+
+
+async def _rate_limit_error(e: HTTPStatusError, message: str) -> _RateLimitError:
+    retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+    _limiter.on_rate_limited(retry_after)
+    if (shared_quota := get_shared_quota()) is not None:
+        await shared_quota.on_rate_limited(retry_after, default_pause=2.0)
+
+    return _RateLimitError(f"{message}: {e.response.text}", retry_after=retry_after)
+
+
+@dataclass(slots=True)
+class ProductDetailsBatch:
+    products: list[AmazonProductDetails]
+    # ASINs whose details had not arrived when the request's deadline passed.
+    missing: list[str]
 
 
 class ScraperAPIService:
-    __slots__ = ("_http_client")
-
-    def __init__(self) -> None:
-        self._http_client = _HttpxClient(
-            base_url="https://api.scraperapi.com/structured/amazon",
-            timeout=30.0,
-            max_connections=50,
-            max_keepalive_connections=10,
+    __slots__ = ("_http_client",)
+
+    def __init__(self, http_client: _HttpxClient | None = None) -> None:
+        self._http_client = http_client or get_http_client()
+
+    async def search_product_on_amazon(
+        self, *, query: str, region: str | None = None, page: int = 1
+    ) -> AmazonSearchResult:
+        key = _search_key(query, region, page)
+
+        def fetch() -> Awaitable[AmazonSearchResult]:
+            return _search_flight.do(
+                key,
+                lambda: self._search_product_on_amazon(query=query, region=region, page=page),
+            )
+
+        cache = get_search_cache()
+        if cache is None:
+            return await fetch()
+
+        return await cache.get_or_fetch(key, fetch)
+
+    async def search_product_pages(
+        self,
+        *,
+        query: str,
+        region: str | None = None,
+        accept: Callable[[SearchProduct], bool],
+        limit: int,
+        max_pages: int | None = None,
+    ) -> list[SearchProduct]:
+        """
+        Collects up to `limit` search results that pass `accept`.
+
+        When the first page falls short, the pages listed in its `next_pages`
+        are fetched concurrently, up to `max_pages` pages in total. Outstanding
+        page fetches are cancelled as soon as enough products have passed.
+        Products are deduplicated by ASIN and kept in page order.
+        """
+        max_pages = max_pages or app_config.SCRAPER.SEARCH_PAGE_BUDGET
+        first = await self.search_product_on_amazon(query=query, region=region)
+        pages = {1: [product for product in first.results if accept(product)]}
+        seen = {product.asin for product in pages[1]}
+
+        page_numbers = [
+            _page_number(str(url), default=index + 2)
+            for index, url in enumerate(first.next_pages[: max_pages - 1])
+        ]
+        if len(seen) >= limit or not page_numbers:
+            return pages[1][:limit]
+
+        tasks = {
+            asyncio.create_task(
+                self.search_product_on_amazon(query=query, region=region, page=page)
+            ): page
+            for page in page_numbers
+        }
+        pending = set(tasks)
+        try:
+            while pending and len(seen) < limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        logger.warning(f"Skipping page {tasks[task]} of '{query}': {task.exception()}")
+                        continue
+
+                    pages[tasks[task]] = [p for p in task.result().results if accept(p)]
+                    seen.update(product.asin for product in pages[tasks[task]])
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+        logger.info(
+            f"Collected {min(len(seen), limit)}/{limit} products for '{query}' from "
+            f"{len(pages)} pages ({len(pending)} page fetches cancelled)"
+        )
+
+        products: dict[str, SearchProduct] = {}
+        for page in sorted(pages):
+            for product in pages[page]:
+                products.setdefault(product.asin, product)
+
+        return list(products.values())[:limit]
+
+    async def find_products(
+        self,
+        *,
+        query: str,
+        region: str | None = None,
+        limit: int,
+        min_rating: float | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        prime_only: bool = False,
+        best_sellers_only: bool = False,
+    ) -> list[SearchProduct]:
+        """
+        Up to `limit` search results that pass the filters, in search rank.
+
+        The product index answers when its coverage is fresh; otherwise result
+        pages are searched upstream until enough products pass.
+        """
+        with track("index"):
+            products = self.search_product_index(
+                query=query,
+                region=region,
+                limit=limit,
+                min_rating=min_rating,
+                min_price=min_price,
+                max_price=max_price,
+                prime_only=prime_only,
+                best_sellers_only=best_sellers_only,
+            )
+        if products is not None:
+            return products
+
+        min_p = min_price if min_price is not None else 0
+        max_p = max_price if max_price is not None else float("inf")
+
+        def accept(p: SearchProduct) -> bool:
+            return (
+                (not prime_only or p.has_prime)
+                and (not best_sellers_only or p.is_best_seller)
+                and (min_rating is None or bool(p.stars and p.stars >= min_rating))
+                and (
+                    (min_price is None and max_price is None)
+                    or bool(p.price and min_p <= p.price <= max_p)
+                )
+            )
+
+        # Following result pages are only fetched when the filters leave page 1 short.
+        with track("search"):
+            return await self.search_product_pages(query=query, region=region, accept=accept, limit=limit)
+
+    async def find_products_for_queries(
+        self,
+        *,
+        queries: Sequence[str],
+        region: str | None = None,
+        limit: int,
+        min_rating: float | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        prime_only: bool = False,
+        best_sellers_only: bool = False,
+    ) -> list[SearchProduct]:
+        """
+        Runs `find_products` for every query concurrently and merges the
+        results with `fuse_rankings`. Failed queries, and queries unfinished
+        when the request's deadline passes, are skipped; the first error is
+        raised only when no query finished.
+        """
+        if not queries:
+            return []
+
+        tasks = {
+            asyncio.create_task(
+                self.find_products(
+                    query=query,
+                    region=region,
+                    limit=limit,
+                    min_rating=min_rating,
+                    min_price=min_price,
+                    max_price=max_price,
+                    prime_only=prime_only,
+                    best_sellers_only=best_sellers_only,
+                )
+            ): query
+            for query in queries
+        }
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=time_left())
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        rankings = []
+        errors: list[BaseException] = []
+        for task, query in tasks.items():
+            if task in pending:
+                _deadline_cuts.labels("search").inc()
+                logger.warning(f"Skipping query '{query}': deadline passed before it finished")
+                errors.append(DeadlineExceeded(f"Search for '{query}' did not finish before the deadline"))
+            elif (error := task.exception()) is not None:
+                logger.warning(f"Skipping query '{query}': {error}")
+                errors.append(error)
+            else:
+                rankings.append(task.result())
+
+        if not rankings and errors:
+            raise errors[0]
+
+        return fuse_rankings(rankings, limit=limit)
+
+    def search_product_index(
+        self,
+        *,
+        query: str,
+        region: str | None = None,
+        limit: int,
+        min_rating: float | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        prime_only: bool = False,
+        best_sellers_only: bool = False,
+    ) -> list[SearchProduct] | None:
+        """Answers from the local product index, or None when its coverage is not fresh enough."""
+        if (index := get_product_index()) is None:
+            return None
+
+        return index.search(
+            _resolve_region(region),
+            query,
+            limit=limit,
+            min_rating=min_rating,
+            min_price=min_price,
+            max_price=max_price,
+            prime_only=prime_only,
+            best_sellers_only=best_sellers_only,
+            max_pages=app_config.SCRAPER.SEARCH_PAGE_BUDGET,
         )
 
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type(_RateLimitError),
-        before_sleep=before_sleep_log(logger, "WARNING"),
+        stop=stop_after_attempt(_RETRY_ATTEMPTS),
+        wait=_wait_retry_after,
+        retry=(
+            retry_if_exception_type(_RateLimitError)
+            & _has_attempts_left
+            & _within_deadline
+            & _within_retry_budget
+        ),
+        before_sleep=_before_retry,
     )
     @with_timer
-    async def search_product_on_amazon(
-        self, *, query: str, region: str | None = None
+    async def _search_product_on_amazon(
+        self, *, query: str, region: str | None = None, page: int = 1
     ) -> AmazonSearchResult:
+        params = {
+            "api_key": app_config.SCRAPER.KEY.get_secret_value(),
+            "query": query,
+            "country_code": region or app_config.SCRAPER.COUNTRY_CODE,
+        }
+        if page > 1:
+            params["page"] = page
+
         async with self._http_client as client:
             try:
-                response = await client.get(
-                    "/search/v1",
-                    params={
-                        "api_key": app_config.SCRAPER.KEY.get_secret_value(),
-                        "query": query,
-                        "country_code": region or app_config.SCRAPER.COUNTRY_CODE,
-                    },
-                )
+                async with _upstream_slot("search", app_config.SCRAPER.SEARCH_CREDIT_COST):
+                    response = await _upstream_get(client, "search", params)
                 response.raise_for_status()
-                data = response.json()
-                data["results"] = [item for item in data["results"] if "asin" in item]
+                _limiter.on_success()
+
+                search_result = AmazonSearchResult.from_json(
+                    response.content, strict=app_config.SCRAPER.DECODE_MODE == "strict"
+                )
+                if (index := get_product_index()) is not None:
+                    index.add(
+                        _resolve_region(region),
+                        query,
+                        search_result.results,
+                        page=page,
+                        total_pages=1 + len(search_result.next_pages),
+                    )
 
-                return AmazonSearchResult(**data)
+                return search_result
 
             except HTTPStatusError as e:
                 if e.response.status_code == 429:
                     logger.warning(
                         f"Rate limit hit for search query '{query}', retrying..."
                     )
-                    raise _RateLimitError(f"Rate limit exceeded: {e.response.text}")
+                    raise await _rate_limit_error(e, "Rate limit exceeded")
 
                 raise
-    
+
     @with_timer
     async def get_products_details(
-        self, search_results: list[SearchProduct]
-    ) -> list[AmazonProductDetails]:
+        self,
+        search_results: list[SearchProduct],
+        region: str | None = None,
+        *,
+        on_details: Callable[[str, AmazonProductDetails], None] | None = None,
+    ) -> ProductDetailsBatch:
+        """
+        Details of the search results, in search rank, skipping failed fetches.
+        `on_details` is called with each product's ASIN and details as they
+        arrive, in completion order.
+
+        When the request's deadline passes first, the details fetched so far
+        are returned and the rest are listed as `missing`.
+        """
+        asin_to_url = {result.asin: str(result.url) for result in search_results}
+        details: dict[str, AmazonProductDetails] = {}
+        missing: set[str] = set()
+        async for asin, result in self.iter_details(asin_to_url, region=region):
+            if isinstance(result, AmazonProductDetails):
+                details[asin] = result
+                if on_details is not None:
+                    on_details(asin, result)
+            elif isinstance(result, DeadlineExceeded):
+                missing.add(asin)
+            elif isinstance(result, Exception):
+                logger.warning(f"Skipping product details: {result}")
+
+        return ProductDetailsBatch(
+            products=[details[asin] for asin in asin_to_url if asin in details],
+            missing=[asin for asin in asin_to_url if asin in missing],
+        )
+
+    async def iter_details(
+        self,
+        asin_to_url: dict[str, str],
+        region: str | None = None,
+        *,
+        concurrency: int | None = None,
+    ) -> AsyncIterator[tuple[str, AmazonProductDetails | None | Exception]]:
+        """
+        Yields `(asin, details)` in completion order, with the exception in
+        place of the details when a fetch failed.
+
+        At most `concurrency` fetches of this call run at once, so one large
+        batch cannot take every upstream slot. Fetches still outstanding when
+        the caller stops iterating are cancelled. So are those unfinished when
+        the request's deadline passes, which are yielded with `DeadlineExceeded`.
+        """
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+        async def fetch(
+            asin: str, url: str, client: AsyncClient
+        ) -> tuple[str, AmazonProductDetails | None | Exception]:
+            try:
+                if semaphore is None:
+                    details = await self._get_product_details(asin=asin, url=url, region=region, client=client)
+                else:
+                    async with semaphore:
+                        details = await self._get_product_details(
+                            asin=asin, url=url, region=region, client=client
+                        )
+            except Exception as e:
+                return asin, e
+
+            return asin, details
+
         async with self._http_client as client:
-            asin_to_url = {result.asin: str(result.url) for result in search_results}
-            results = await asyncio.gather(
-                *[
-                    self._get_product_details(asin=asin, url=url, client=client)
-                    for asin, url in asin_to_url.items()
-                ],
-                return_exceptions=True,
+            tasks = {asyncio.create_task(fetch(asin, url, client)): asin for asin, url in asin_to_url.items()}
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, timeout=time_left(), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        break
+
+                    for task in done:
+                        yield task.result()
+
+                if pending:
+                    _deadline_cuts.labels("details").inc(len(pending))
+                    logger.warning(f"Deadline passed with {len(pending)}/{len(tasks)} product details unfinished")
+                    for task in pending:
+                        task.cancel()
+                    for task in tasks:
+                        if task in pending:
+                            yield tasks[task], DeadlineExceeded("Product details did not arrive before the deadline")
+
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def _get_product_details(
+        self, *, asin: str, url: str, region: str | None, client: AsyncClient
+    ) -> AmazonProductDetails | None:
+        key = _details_key(asin, region)
+
+        def attempt() -> Awaitable[AmazonProductDetails]:
+            return self._fetch_product_details(asin=asin, url=url, region=region, client=client)
+
+        def fetch() -> Awaitable[AmazonProductDetails]:
+            # A slow fetch is hedged with a second one; the first to answer wins.
+            return _details_flight.do(
+                key, lambda: _details_hedger.do(attempt) if app_config.SCRAPER.HEDGE else attempt()
             )
 
-            return [result for result in results if isinstance(result, AmazonProductDetails)]
+        cache = get_details_cache()
+        if cache is None:
+            return await fetch()
+
+        return await cache.get_or_fetch(key, fetch)
 
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((_RateLimitError, RequestError)),
-        before_sleep=before_sleep_log(logger, "WARNING"),
+        stop=stop_after_attempt(_RETRY_ATTEMPTS),
+        wait=_wait_retry_after,
+        retry=(
+            retry_if_exception_type((_RateLimitError, RequestError))
+            & _has_attempts_left
+            & _within_deadline
+            & _within_retry_budget
+        ),
+        before_sleep=_before_retry,
     )
     @with_timer
-    @with_semaphore(semaphore=_semaphore)
-    async def _get_product_details(
-        self, *, asin: str, url: str, client: AsyncClient
-    ) -> AmazonProductDetails | None:
+    async def _fetch_product_details(
+        self, *, asin: str, url: str, region: str | None, client: AsyncClient
+    ) -> AmazonProductDetails:
         try:
-            response = await client.get(
-                "/product/v1",
-                params={
-                    "api_key": app_config.SCRAPER.KEY.get_secret_value(),
-                    "asin": asin,
-                },
-            )
+            async with _upstream_slot("product", app_config.SCRAPER.DETAILS_CREDIT_COST):
+                response = await _upstream_get(
+                    client,
+                    "product",
+                    {
+                        "api_key": app_config.SCRAPER.KEY.get_secret_value(),
+                        "asin": asin,
+                        "country_code": region or app_config.SCRAPER.COUNTRY_CODE,
+                    },
+                )
             response.raise_for_status()
-            data = response.json()
-            data["url"] = url
-            return AmazonProductDetails(**data)
+            _limiter.on_success()
+            return AmazonProductDetails.from_json(response.content, url=url)
 
         except HTTPStatusError as e:
             if e.response.status_code == 429:
                 logger.warning(f"Rate limit hit for ASIN {asin}, retrying...")
-                raise _RateLimitError(
-                    f"Rate limit exceeded for ASIN {asin}: {e.response.text}"
-                )
+                raise await _rate_limit_error(e, f"Rate limit exceeded for ASIN {asin}")
 
             logger.error(
                 f"HTTP error for ASIN {asin}: {e.response.status_code} - {e.response.text}"
@@ -169,11 +949,9 @@ class ScraperAPIService:
             logger.warning(f"Request error for ASIN {asin}, retrying: {str(e)}")
             raise
 
-    async def close(self):
-        await self._http_client.close()
-
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.close()
+        # The HTTP client is process-wide and closed by the app lifespan.
+        return None
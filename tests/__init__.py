@@ -0,0 +1,6 @@
+import os
+
+# The app reads its settings at import time; tests never talk to the real services.
+os.environ.setdefault("SCRAPERAPI_KEY", "test")
+os.environ.setdefault("SERVER_TOKEN", "test")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
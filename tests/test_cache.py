@@ -0,0 +1,43 @@
+import asyncio
+import unittest
+
+from pydantic import BaseModel
+
+from src.core.cache import TieredCache
+from src.core.deadline import Deadline, current_deadline, set_deadline
+
+
+class _Value(BaseModel):
+    value: int
+
+
+class TieredCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_stale_entry_is_served_while_refreshing(self) -> None:
+        cache: TieredCache[_Value] = TieredCache(name="test", model=_Value, max_entries=10, ttl=0, stale_ttl=60)
+        await cache.set("key", _Value(value=1))
+
+        async def fetch() -> _Value:
+            return _Value(value=2)
+
+        self.assertEqual((await cache.get_or_fetch("key", fetch)).value, 1)
+        await asyncio.sleep(0.01)
+        self.assertEqual((await cache.get("key")).value.value, 2)
+
+    async def test_refresh_does_not_inherit_the_triggering_requests_deadline(self) -> None:
+        cache: TieredCache[_Value] = TieredCache(name="test", model=_Value, max_entries=10, ttl=0, stale_ttl=60)
+        await cache.set("key", _Value(value=1))
+        seen: list[Deadline | None] = []
+
+        async def fetch() -> _Value:
+            seen.append(current_deadline())
+            return _Value(value=2)
+
+        set_deadline(Deadline.after(10))
+        await cache.get_or_fetch("key", fetch)
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(seen, [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.agent.checkpointer import BoundedMemorySaver, _SQLiteThreadStore
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+class BoundedMemorySaverTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.path = os.path.join(self._dir.name, "checkpoints.db")
+
+    def saver(self, **kwargs) -> BoundedMemorySaver:
+        saver = BoundedMemorySaver(sqlite_path=self.path, **kwargs)
+        self.addCleanup(saver.close)
+        return saver
+
+    async def test_evicted_thread_is_restored_from_sqlite(self) -> None:
+        saver = self.saver(max_threads=1)
+        checkpoint = empty_checkpoint()
+        await saver.aput(_config("a"), checkpoint, {"step": 0}, {})
+        await saver.aput(_config("b"), empty_checkpoint(), {"step": 0}, {})
+        self.assertEqual(saver.evictions, 1)
+
+        restored = await saver.aget_tuple(_config("a"))
+
+        self.assertEqual(restored.checkpoint["id"], checkpoint["id"])
+
+    async def test_writes_to_an_evicted_thread_keep_its_checkpoints(self) -> None:
+        saver = self.saver(max_threads=1)
+        checkpoint = empty_checkpoint()
+        config = await saver.aput(_config("a"), checkpoint, {"step": 0}, {})
+        await saver.aput(_config("b"), empty_checkpoint(), {"step": 0}, {})
+
+        await saver.aput_writes(config, [("messages", "hi")], "task")
+
+        # A fresh worker only has what was persisted.
+        restored = await self.saver().aget_tuple(_config("a"))
+        self.assertEqual(restored.checkpoint["id"], checkpoint["id"])
+        self.assertEqual(restored.pending_writes, [("task", "messages", "hi")])
+
+    async def test_threads_in_flight_are_not_evicted(self) -> None:
+        saver = self.saver(max_threads=1, in_flight=lambda thread_id: thread_id == "a")
+        await saver.aput(_config("a"), empty_checkpoint(), {"step": 0}, {})
+        await saver.aput(_config("b"), empty_checkpoint(), {"step": 0}, {})
+        await saver.aput(_config("c"), empty_checkpoint(), {"step": 0}, {})
+
+        self.assertEqual(saver.stats()["threads"], 2)
+        self.assertIsNotNone(saver.get_tuple(_config("a")))
+        self.assertEqual(saver.evictions, 1)
+
+    async def test_async_writes_load_threads_off_the_event_loop(self) -> None:
+        saver = self.saver()
+        loads: list[bool] = []
+        load = _SQLiteThreadStore.load
+
+        def tracked_load(store: _SQLiteThreadStore, thread_id: str) -> dict | None:
+            loads.append(threading.current_thread() is threading.main_thread())
+            return load(store, thread_id)
+
+        with mock.patch.object(_SQLiteThreadStore, "load", tracked_load):
+            config = await saver.aput(_config("a"), empty_checkpoint(), {"step": 0}, {})
+            await saver.aput_writes(config, [("messages", "hi")], "task")
+            await saver.aget_tuple(_config("new"))
+
+        self.assertEqual(loads, [False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
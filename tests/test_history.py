@@ -0,0 +1,75 @@
+import unittest
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.api.core.models import ChatRequest
+from src.api.services.history import HistoryConflictError, new_messages
+
+STORED = [
+    HumanMessage("find a gaming mouse", id="m1"),
+    AIMessage("", id="m2", tool_calls=[{"name": "search_on_amazon", "args": {}, "id": "call-1"}]),
+    ToolMessage("{}", id="m3", tool_call_id="call-1"),
+    AIMessage("Here are three mice.", id="m4"),
+]
+
+
+def _request(*contents: tuple[str, str], last_message_id: str | None = None) -> ChatRequest:
+    return ChatRequest(
+        messages=[{"role": role, "content": content} for role, content in contents],
+        last_message_id=last_message_id,
+    )
+
+
+class NewMessagesTest(unittest.TestCase):
+    def test_delta_continuing_the_thread_is_kept_whole(self) -> None:
+        request = _request(("user", "cheaper ones?"), last_message_id="m4")
+
+        self.assertEqual([m.content for m in new_messages(request, STORED)], ["cheaper ones?"])
+
+    def test_delta_behind_the_thread_conflicts(self) -> None:
+        request = _request(("user", "cheaper ones?"), last_message_id="m1")
+
+        with self.assertRaises(HistoryConflictError) as raised:
+            new_messages(request, STORED)
+
+        self.assertEqual(raised.exception.detail, "Thread has newer messages than last_message_id")
+        self.assertEqual(raised.exception.last_message_id, "m4")
+
+    def test_delta_from_another_thread_conflicts(self) -> None:
+        request = _request(("user", "cheaper ones?"), last_message_id="elsewhere")
+
+        with self.assertRaises(HistoryConflictError) as raised:
+            new_messages(request, STORED)
+
+        self.assertEqual(raised.exception.detail, "last_message_id is not part of this thread")
+
+    def test_full_history_is_deduplicated_against_the_thread(self) -> None:
+        request = _request(
+            ("user", "find a gaming mouse"),
+            ("assistant", "Searching...\nHere are three mice."),
+            ("user", "cheaper ones?"),
+        )
+
+        self.assertEqual([m.content for m in new_messages(request, STORED)], ["cheaper ones?"])
+
+    def test_history_without_the_latest_answer_is_all_new(self) -> None:
+        request = _request(("user", "cheaper ones?"))
+
+        self.assertEqual([m.content for m in new_messages(request, STORED)], ["cheaper ones?"])
+
+    def test_empty_thread_takes_every_message(self) -> None:
+        request = _request(("user", "hi"), ("user", "find a mouse"))
+
+        self.assertEqual(len(new_messages(request, [])), 2)
+
+    def test_history_with_nothing_new_conflicts(self) -> None:
+        request = _request(("user", "find a gaming mouse"), ("assistant", "Here are three mice."))
+
+        with self.assertRaises(HistoryConflictError) as raised:
+            new_messages(request, STORED)
+
+        self.assertEqual(raised.exception.detail, "No new messages after the stored thread")
+
+
+if __name__ == "__main__":
+    unittest.main()
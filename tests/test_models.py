@@ -0,0 +1,23 @@
+import unittest
+
+from pydantic import ValidationError
+
+from src.api.core.models import ChatRequest
+from src.core.config import app_config
+
+
+class ChatRequestTest(unittest.TestCase):
+    def test_deadline_is_bounded_by_the_configured_maximum(self) -> None:
+        messages = [{"role": "user", "content": "hi"}]
+
+        self.assertEqual(
+            ChatRequest(messages=messages, deadline=app_config.AGENT.DEADLINE_MAX).deadline,
+            app_config.AGENT.DEADLINE_MAX,
+        )
+        for deadline in (0, app_config.AGENT.DEADLINE_MAX + 1, float("inf")):
+            with self.assertRaises(ValidationError):
+                ChatRequest(messages=messages, deadline=deadline)
+
+
+if __name__ == "__main__":
+    unittest.main()
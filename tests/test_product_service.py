@@ -0,0 +1,76 @@
+import unittest
+
+from starlette.background import BackgroundTask
+
+from src.api.services.product_service import ProductsBusyError, ProductService, _Admission
+from src.core.timing import RequestTiming
+
+
+async def _items(*, fail: bool = False):
+    yield {"type": "product", "rank": 0, "asin": "B000000001"}
+    if fail:
+        raise RuntimeError("upstream went away")
+    yield {"type": "error", "rank": 1, "asin": "B000000002", "error": "Product not found"}
+
+
+class AdmissionTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.admission = _Admission(limit=1)
+
+    def test_requests_over_the_limit_are_turned_away(self) -> None:
+        self.admission.acquire()
+        with self.assertRaises(ProductsBusyError):
+            self.admission.acquire()
+
+    def test_release_is_idempotent(self) -> None:
+        slot = self.admission.acquire()
+        slot.release()
+        slot.release()
+
+        self.assertEqual(self.admission.in_flight, 0)
+        self.admission.acquire()
+        self.assertEqual(self.admission.in_flight, 1)
+
+    async def test_finished_stream_releases_its_slot(self) -> None:
+        slot = self.admission.acquire()
+        lines = [line async for line in ProductService.stream_ndjson(_items(), RequestTiming(), slot)]
+
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(self.admission.in_flight, 0)
+
+    async def test_failed_stream_releases_its_slot(self) -> None:
+        slot = self.admission.acquire()
+        with self.assertRaises(RuntimeError):
+            async for _ in ProductService.stream_ndjson(_items(fail=True), RequestTiming(), slot):
+                pass
+
+        self.assertEqual(self.admission.in_flight, 0)
+
+    async def test_abandoned_stream_releases_its_slot(self) -> None:
+        slot = self.admission.acquire()
+        stream = ProductService.stream_ndjson(_items(), RequestTiming(), slot)
+        await anext(stream)
+        await stream.aclose()
+
+        self.assertEqual(self.admission.in_flight, 0)
+
+    async def test_stream_that_never_starts_is_released_by_the_background_task(self) -> None:
+        slot = self.admission.acquire()
+        stream = ProductService.stream_ndjson(_items(), RequestTiming(), slot)
+        await stream.aclose()
+        self.assertEqual(self.admission.in_flight, 1)
+
+        await BackgroundTask(slot.release)()
+
+        self.assertEqual(self.admission.in_flight, 0)
+
+    async def test_stream_and_background_task_release_once(self) -> None:
+        slot = self.admission.acquire()
+        [line async for line in ProductService.stream_ndjson(_items(), RequestTiming(), slot)]
+        await BackgroundTask(slot.release)()
+
+        self.assertEqual(self.admission.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
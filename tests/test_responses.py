@@ -0,0 +1,50 @@
+import unittest
+
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+
+from src.api.core.responses import ReleasingStreamingResponse
+
+
+class ReleasingStreamingResponseTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.released = 0
+        self.started = False
+
+    def release(self) -> None:
+        self.released += 1
+
+    async def body(self):
+        self.started = True
+        yield "line\n"
+
+    async def receive(self) -> dict:
+        return {"type": "http.disconnect"}
+
+    async def test_background_runs_once_after_a_normal_stream(self) -> None:
+        messages = []
+
+        async def send(message: dict) -> None:
+            messages.append(message)
+
+        response = ReleasingStreamingResponse(self.body(), background=BackgroundTask(self.release))
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, self.receive, send)
+
+        self.assertTrue(self.started)
+        self.assertEqual(messages[-1]["more_body"], False)
+        self.assertEqual(self.released, 1)
+
+    async def test_background_runs_when_the_client_is_gone_before_the_body(self) -> None:
+        async def send(message: dict) -> None:
+            raise OSError("connection reset")
+
+        response = ReleasingStreamingResponse(self.body(), background=BackgroundTask(self.release))
+        with self.assertRaises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, self.receive, send)
+
+        self.assertFalse(self.started)
+        self.assertEqual(self.released, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+from src.core.shared_quota import SharedQuota
+
+
+class SharedQuotaTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.quota = SharedQuota(path=os.path.join(self._dir.name, "quota.db"), max_concurrency=1)
+
+    async def test_release_frees_the_lease(self) -> None:
+        holder = await self.quota.acquire()
+        await self.quota.release(holder)
+
+        self.assertEqual(self.quota.stats()["in_flight"], 0)
+        self.quota.close()
+
+    async def test_release_survives_sqlite_errors(self) -> None:
+        holder = await self.quota.acquire()
+        self.quota.close()
+
+        # The closed connection raises sqlite3.ProgrammingError; it must not reach the caller.
+        await self.quota.release(holder)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+
+from src.core.deadline import Deadline, DeadlineExceeded, current_deadline, set_deadline
+from src.core.singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_task(self) -> None:
+        flight: SingleFlight[int] = SingleFlight("test")
+        calls = 0
+
+        async def fetch() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual(flight.stats(), {"calls": 5, "deduplicated": 4, "in_flight": 0})
+
+    async def test_call_after_last_waiter_cancelled_starts_a_new_flight(self) -> None:
+        flight: SingleFlight[str] = SingleFlight("test")
+
+        async def slow() -> str:
+            await asyncio.sleep(10)
+            return "slow"
+
+        async def fast() -> str:
+            return "fast"
+
+        waiter = asyncio.create_task(flight.do("key", slow))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        # The cancelled task's done-callback has not run yet; this must not join it.
+        self.assertEqual(await flight.do("key", fast), "fast")
+
+    async def test_flight_does_not_inherit_the_first_callers_deadline(self) -> None:
+        flight: SingleFlight[Deadline | None] = SingleFlight("test")
+
+        async def fetch() -> Deadline | None:
+            return current_deadline()
+
+        set_deadline(Deadline.after(10))
+        self.assertIsNone(await flight.do("key", fetch))
+
+    async def test_each_waiter_applies_its_own_deadline(self) -> None:
+        flight: SingleFlight[str] = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def fetch() -> str:
+            await release.wait()
+            return "done"
+
+        async def call(seconds: float | None) -> str:
+            set_deadline(Deadline.after(seconds) if seconds is not None else None)
+            return await flight.do("key", fetch)
+
+        patient = asyncio.create_task(call(None))
+        await asyncio.sleep(0)
+        with self.assertRaises(DeadlineExceeded):
+            await call(0.01)
+
+        # The impatient caller gave up alone; the flight still serves the other one.
+        release.set()
+        self.assertEqual(await patient, "done")
+
+    async def test_last_waiter_past_its_deadline_cancels_the_flight(self) -> None:
+        flight: SingleFlight[str] = SingleFlight("test")
+        cancelled = asyncio.Event()
+
+        async def fetch() -> str:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "slow"
+
+        set_deadline(Deadline.after(0.01))
+        with self.assertRaises(DeadlineExceeded):
+            await flight.do("key", fetch)
+
+        await asyncio.wait_for(cancelled.wait(), 1)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+
+from src.core.thread_scheduler import SUPERSEDED, ThreadBusyError, ThreadScheduler
+
+
+class ThreadSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_queue_runs_one_at_a_time_in_order(self) -> None:
+        scheduler = ThreadScheduler(policy="queue", max_queue=2)
+        first = await scheduler.acquire("t")
+        order: list[int] = []
+
+        async def run(index: int) -> None:
+            lease = await scheduler.acquire("t")
+            order.append(index)
+            lease.release()
+
+        waiting = [asyncio.create_task(run(index)) for index in (1, 2)]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queue_depth("t"), 2)
+
+        first.release()
+        await asyncio.gather(*waiting)
+
+        self.assertEqual(order, [1, 2])
+        self.assertFalse(scheduler.is_busy("t"))
+
+    async def test_queue_rejects_once_full(self) -> None:
+        scheduler = ThreadScheduler(policy="queue", max_queue=1)
+        await scheduler.acquire("t")
+        queued = asyncio.create_task(scheduler.acquire("t"))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(ThreadBusyError) as raised:
+            await scheduler.acquire("t")
+
+        self.assertEqual(raised.exception.queue_depth, 1)
+        queued.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+
+    async def test_reject_fails_at_once_on_a_busy_thread(self) -> None:
+        scheduler = ThreadScheduler(policy="reject")
+        await scheduler.acquire("t")
+
+        with self.assertRaises(ThreadBusyError):
+            await scheduler.acquire("t")
+
+        # Other threads are unaffected.
+        (await scheduler.acquire("other")).release()
+        self.assertEqual(scheduler.stats()["rejected"], 1)
+
+    async def test_cancel_supersedes_the_running_and_queued_runs(self) -> None:
+        scheduler = ThreadScheduler(policy="cancel")
+        held = asyncio.Event()
+
+        async def running() -> None:
+            lease = await scheduler.acquire("t")
+            held.set()
+            try:
+                await asyncio.sleep(10)
+            finally:
+                lease.release()
+
+        owner = asyncio.create_task(running())
+        await held.wait()
+        queued = asyncio.create_task(scheduler.acquire("t"))
+        await asyncio.sleep(0)
+
+        newest = await scheduler.acquire("t")
+
+        with self.assertRaises(asyncio.CancelledError):
+            await owner
+        with self.assertRaises(ThreadBusyError) as raised:
+            await queued
+        self.assertEqual(raised.exception.detail, SUPERSEDED)
+        self.assertFalse(newest.superseded)
+        self.assertEqual(scheduler.stats()["superseded"], 2)
+
+    async def test_waiter_cancelled_while_queued_leaves_the_queue(self) -> None:
+        scheduler = ThreadScheduler(policy="queue")
+        lease = await scheduler.acquire("t")
+        queued = asyncio.create_task(scheduler.acquire("t"))
+        await asyncio.sleep(0)
+
+        queued.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+
+        self.assertEqual(scheduler.queue_depth("t"), 0)
+        lease.release()
+        self.assertFalse(scheduler.is_busy("t"))
+
+    async def test_release_is_idempotent(self) -> None:
+        scheduler = ThreadScheduler(policy="queue")
+        lease = await scheduler.acquire("t")
+        queued = asyncio.create_task(scheduler.acquire("t"))
+        await asyncio.sleep(0)
+
+        lease.release()
+        lease.release()
+        next_lease = await queued
+
+        self.assertTrue(scheduler.is_busy("t"))
+        next_lease.release()
+        self.assertFalse(scheduler.is_busy("t"))
+
+
+if __name__ == "__main__":
+    unittest.main()